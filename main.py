@@ -9,21 +9,39 @@ Based on the import-era5-daily notebook from dhis2/climate-tools.
 Configuration is loaded from environment variables (or .env file).
 """
 
+import contextlib
+import functools
+import glob
+import hashlib
+import itertools
 import json
 import logging
+import math
 import os
-from datetime import date
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timezone
+from typing import Callable, Iterable, Iterator, NamedTuple
 
 import geopandas as gpd
+import httpx
+import netCDF4
+import numpy as np
+import pandas as pd
+import shapely
 import xarray as xr
 from dhis2_client import DHIS2Client
+from dhis2_client.errors import DHIS2HTTPError
 from dhis2_client.settings import ClientSettings
 from dotenv import load_dotenv
 from earthkit import transforms
+from ecmwf.datastores import Client
 from metpy.units import units
+from scipy import sparse
+from scipy.sparse import csgraph
 
-from dhis2eo.data.cds import era5_land
-from dhis2eo.integrations.pandas import dataframe_to_dhis2_json
+from dhis2eo.integrations.pandas import format_value_for_dhis2
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -46,22 +64,28 @@ DHIS2_USERNAME = os.getenv("DHIS2_USERNAME")
 DHIS2_PASSWORD = os.getenv("DHIS2_PASSWORD")
 
 # DHIS2 data element to import into (required)
+# Several data elements can be imported in one run as a comma-separated list. The variable, value column,
+# cumulative flag, units and temporal aggregation below then take one value per data element (same order),
+# or a single value used for all of them. All variables are downloaded together.
 DHIS2_DATA_ELEMENT_ID = os.getenv("DHIS2_DATA_ELEMENT_ID")
 
 # ERA5 variable configuration
 # DHIS2_VARIABLE: CDS catalogue name (e.g., "total_precipitation")
 # DHIS2_VALUE_COL: Column name in downloaded xarray dataset (e.g., "tp")
 # These are coupled - the value_col depends on which variable you download
-DHIS2_VARIABLE = os.getenv("DHIS2_VARIABLE", "total_precipitation")
-DHIS2_VALUE_COL = os.getenv("DHIS2_VALUE_COL", "tp")
-DHIS2_IS_CUMULATIVE = os.getenv("DHIS2_IS_CUMULATIVE", True)  # maybe this should be default False, since it's primarily for precipitation
+DHIS2_VARIABLE = os.getenv("DHIS2_VARIABLE", "total_precipitation").split(",")
+DHIS2_VALUE_COL = os.getenv("DHIS2_VALUE_COL", "tp").split(",")
+# maybe this should be default false, since it's primarily for precipitation
+DHIS2_IS_CUMULATIVE = [value.lower() == "true" for value in os.getenv("DHIS2_IS_CUMULATIVE", "true").split(",")]
 
 # Unit conversion
-DHIS2_FROM_UNITS = os.getenv("DHIS2_FROM_UNITS", "m")
-DHIS2_TO_UNITS = os.getenv("DHIS2_TO_UNITS", "mm")
+DHIS2_FROM_UNITS = os.getenv("DHIS2_FROM_UNITS", "m").split(",")
+DHIS2_TO_UNITS = os.getenv("DHIS2_TO_UNITS", "mm").split(",")
 
 # Aggregation settings
-DHIS2_TEMPORAL_AGGREGATION = os.getenv("DHIS2_TEMPORAL_AGGREGATION", "sum")
+DHIS2_TEMPORAL_AGGREGATION = os.getenv("DHIS2_TEMPORAL_AGGREGATION", "sum").split(",")
+# DHIS2 period type of each data element (DAILY, WEEKLY, MONTHLY or YEARLY), coarser ones are aggregated from days
+DHIS2_PERIOD_TYPE = os.getenv("DHIS2_PERIOD_TYPE", "DAILY").upper().split(",")
 DHIS2_SPATIAL_AGGREGATION = os.getenv("DHIS2_SPATIAL_AGGREGATION", "mean")
 
 # Date range
@@ -71,11 +95,1118 @@ DHIS2_END_DATE = os.getenv("DHIS2_END_DATE", date.today().isoformat())
 # Download settings (v2 specific - file-based caching)
 DHIS2_DOWNLOAD_FOLDER = os.getenv("DHIS2_DOWNLOAD_FOLDER", "./target/data")
 DHIS2_DOWNLOAD_PREFIX = os.getenv("DHIS2_DOWNLOAD_PREFIX", "era5_hourly")
+# Maximum number of separate bounding boxes to download, for territories with islands or exclaves
+DHIS2_DOWNLOAD_REGIONS = int(os.getenv("DHIS2_DOWNLOAD_REGIONS", "1"))
+# Maximum number of monthly CDS requests queued or running at the same time
+DHIS2_DOWNLOAD_CONCURRENCY = int(os.getenv("DHIS2_DOWNLOAD_CONCURRENCY", "4"))
+# "all" downloads every hour, "needed" only the hours the daily values are computed from (see needed_hours)
+DHIS2_DOWNLOAD_HOURS = os.getenv("DHIS2_DOWNLOAD_HOURS", "all").lower()
+# In "needed" mode, instantaneous variables are sampled every this many hours of the local day (1 = every hour)
+DHIS2_INSTANT_HOUR_STEP = int(os.getenv("DHIS2_INSTANT_HOUR_STEP", "1"))
+# "hourly" reduces hourly data to days locally, "daily" downloads daily means, maxima and minima computed by CDS
+DHIS2_SOURCE = os.getenv("DHIS2_SOURCE", "hourly").lower()
 
 # Other settings
-DHIS2_TIMEZONE_OFFSET = int(os.getenv("DHIS2_TIMEZONE_OFFSET", "0"))
-DHIS2_ORG_UNIT_LEVEL = int(os.getenv("DHIS2_ORG_UNIT_LEVEL", "2"))
+# Hours, or "auto" to derive each org unit's offset from its centroid longitude
+DHIS2_TIMEZONE_OFFSET = os.getenv("DHIS2_TIMEZONE_OFFSET", "0").lower()
+# Offsets of org units (and everything below them) that differ from DHIS2_TIMEZONE_OFFSET, e.g. "uid1:3,uid2:2"
+DHIS2_TIMEZONE_OFFSETS = {
+    org_unit_id: int(offset)
+    for org_unit_id, offset in (item.split(":") for item in os.getenv("DHIS2_TIMEZONE_OFFSETS", "").split(",") if item)
+}
+# DHIS2_ORG_UNIT_LEVEL can be a comma-separated list (e.g. "2,3,4"), aggregated once at the finest level
+DHIS2_ORG_UNIT_LEVEL = [int(level) for level in os.getenv("DHIS2_ORG_UNIT_LEVEL", "2").split(",")]
 DHIS2_DRY_RUN = os.getenv("DHIS2_DRY_RUN", "true").lower() == "true"
+# Maximum number of data values per dataValueSets request, payloads are built one request at a time
+DHIS2_IMPORT_BATCH_SIZE = int(os.getenv("DHIS2_IMPORT_BATCH_SIZE", "50000"))
+
+# Download cache disk budget in GB (0 = unlimited) for downloaded months and stores, least recently used first
+DHIS2_CACHE_MAX_GB = float(os.getenv("DHIS2_CACHE_MAX_GB", "0"))
+
+# Org unit geometry cache (stored in the download folder)
+DHIS2_GEOMETRY_CACHE = os.getenv("DHIS2_GEOMETRY_CACHE", "true").lower() == "true"
+
+
+# =============================================================================
+# Organisation Unit Geometries
+# =============================================================================
+
+
+def org_units_from_geojson(geojson: dict) -> gpd.GeoDataFrame:
+    """Build a GeoDataFrame directly from a parsed GeoJSON FeatureCollection.
+
+    Polygon and MultiPolygon geometries (the common case for org unit boundaries) are assembled with
+    vectorized shapely constructors from one flat coordinate array, instead of serializing the dict back
+    to a string for gpd.read_file. Other geometry types are converted one by one.
+    """
+    features = geojson.get("features", [])
+    geometries = np.full(len(features), None, dtype=object)
+    is_multi = np.zeros(len(features), dtype=bool)
+    rings: list[np.ndarray] = []
+    ring_polygon: list[int] = []  # polygon index of each ring (first ring is the shell, the rest are holes)
+    polygon_feature: list[int] = []  # feature index of each polygon
+
+    for i, feature in enumerate(features):
+        geometry = feature.get("geometry")
+        if not geometry:
+            continue
+        if geometry["type"] == "Polygon":
+            polygons = [geometry["coordinates"]]
+        elif geometry["type"] == "MultiPolygon":
+            polygons = geometry["coordinates"]
+            is_multi[i] = True
+        else:
+            geometries[i] = shapely.geometry.shape(geometry)
+            continue
+        for polygon in polygons:
+            for ring in polygon:
+                rings.append(np.asarray(ring, dtype=float)[:, :2])
+                ring_polygon.append(len(polygon_feature))
+            polygon_feature.append(i)
+
+    if rings:
+        try:
+            ring_index = np.repeat(np.arange(len(rings)), [len(ring) for ring in rings])
+            linear_rings = shapely.linearrings(np.concatenate(rings), indices=ring_index)
+            polygon_geoms = shapely.polygons(linear_rings, indices=ring_polygon)
+            owners = np.asarray(polygon_feature)
+            single = ~is_multi[owners]
+            geometries[owners[single]] = polygon_geoms[single]
+            if not single.all():
+                multi_owners, multi_index = np.unique(owners[~single], return_inverse=True)
+                geometries[multi_owners] = shapely.multipolygons(polygon_geoms[~single], indices=multi_index)
+        except (ValueError, shapely.errors.GEOSException):
+            # Malformed rings (e.g. fewer than 4 points) are tolerated by the per-feature constructor
+            logger.warning("Could not build geometries in bulk, falling back to per-feature construction")
+            geometries = np.array(
+                [shapely.geometry.shape(f["geometry"]) if f.get("geometry") else None for f in features], dtype=object
+            )
+
+    properties = pd.DataFrame.from_records([feature.get("properties") or {} for feature in features])
+    if "id" not in properties:
+        properties.insert(0, "id", [feature.get("id") for feature in features])
+    return gpd.GeoDataFrame(properties, geometry=geometries, crs="EPSG:4326")
+
+
+def _org_units_metadata(client: DHIS2Client, level: int) -> dict[str, dict]:
+    """Fetch id, hierarchy path and lastUpdated of every org unit at a level, keyed by id.
+
+    This is a small request compared to the full GeoJSON.
+    """
+    response = client.get(
+        "/api/organisationUnits",
+        params={"level": str(level), "fields": "id,path,lastUpdated", "paging": "false"},
+    )
+    return {ou["id"]: ou for ou in response.get("organisationUnits", [])}
+
+
+def _org_units_fingerprint(metadata: dict[str, dict]) -> str:
+    """Hash org unit metadata, which changes whenever an org unit is added, removed, moved or edited."""
+    entries = sorted(f"{uid}:{ou.get('path', '')}:{ou.get('lastUpdated', '')}" for uid, ou in metadata.items())
+    return hashlib.sha256("\n".join(entries).encode()).hexdigest()
+
+
+def load_org_units(client: DHIS2Client, level: int, cache_folder: str | None = None) -> gpd.GeoDataFrame:
+    """Fetch org unit geometries for a level, reusing a local cache while DHIS2 reports no changes.
+
+    The returned GeoDataFrame has a "path" column with the org unit hierarchy path (/<level 1>/<level 2>/...).
+    The cache is keyed by DHIS2 base URL and level. If cache_folder is None, the cache is bypassed.
+    """
+    started = time.perf_counter()
+    metadata = _org_units_metadata(client, level)
+    if cache_folder is None:
+        org_units = org_units_from_geojson(client.get_org_units_geojson(level=level))
+        org_units["path"] = org_units["id"].map(lambda uid: metadata.get(uid, {}).get("path"))
+        return org_units
+
+    cache_key = hashlib.sha256(f"{client.base_url}|{level}".encode()).hexdigest()[:16]
+    cache_path = os.path.join(cache_folder, f"org_units_{cache_key}.pkl")
+    meta_path = os.path.join(cache_folder, f"org_units_{cache_key}.json")
+
+    fingerprint = _org_units_fingerprint(metadata)
+    if os.path.exists(cache_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("fingerprint") == fingerprint:
+            org_units = pd.read_pickle(cache_path)
+            logger.info("Org unit cache hit for level %d (%.2fs, %s)", level, time.perf_counter() - started, cache_path)
+            return org_units
+        logger.info("Org unit cache stale for level %d, boundaries changed in DHIS2", level)
+    else:
+        logger.info("Org unit cache miss for level %d", level)
+
+    org_units = org_units_from_geojson(client.get_org_units_geojson(level=level))
+    org_units["path"] = org_units["id"].map(lambda uid: metadata.get(uid, {}).get("path"))
+
+    # Write to temporary files first so an interrupted run never leaves a half-written cache
+    os.makedirs(cache_folder, exist_ok=True)
+    org_units.to_pickle(f"{cache_path}.tmp")
+    with open(f"{meta_path}.tmp", "w") as f:
+        json.dump({"base_url": client.base_url, "level": level, "fingerprint": fingerprint}, f)
+    os.replace(f"{cache_path}.tmp", cache_path)
+    os.replace(f"{meta_path}.tmp", meta_path)
+    logger.info("Org unit cache updated for level %d (%.2fs)", level, time.perf_counter() - started)
+    return org_units
+
+
+# =============================================================================
+# Spatial Aggregation
+# =============================================================================
+
+# Spatial aggregations computed from a cached sparse (cells x org units) weight matrix,
+# as (weight method, reduction). Anything else (median, std, ...) falls back to earthkit's reduce.
+#   centroid: a cell belongs to the org unit its centre lies in; a centre on a shared boundary belongs to
+#             only one of them (the first in org unit order), so no cell is counted twice
+#   area: cells are weighted by the fraction of the cell covered by the org unit times cos(latitude)
+SPATIAL_WEIGHT_METHODS = {
+    "mean": ("centroid", "mean"),
+    "sum": ("centroid", "sum"),
+    "area_mean": ("area", "mean"),
+    "max": ("centroid", "max"),
+    "min": ("centroid", "min"),
+}
+
+# Bumped whenever the weights computed for the same cells and org units change, invalidating cached matrices
+WEIGHTS_VERSION = 3
+
+# ERA5-Land native grid resolution in degrees
+ERA5_LAND_RESOLUTION = 0.1
+
+
+def _cell_coords(da: xr.DataArray) -> tuple[np.ndarray, np.ndarray]:
+    """Return the latitude and longitude of every grid cell, in the order the cells are reduced.
+
+    Data is either on a regular (latitude, longitude) grid, numbered in row-major order,
+    or already stacked along a "cell" dimension (see combine_regions).
+    """
+    if "cell" in da.dims:
+        return da["latitude"].values, da["longitude"].values
+    lon_2d, lat_2d = np.meshgrid(da["longitude"].values, da["latitude"].values)
+    return lat_2d.ravel(), lon_2d.ravel()
+
+
+def _weights_cache_key(lat: np.ndarray, lon: np.ndarray, org_units: gpd.GeoDataFrame, method: str) -> str:
+    """Hash the cell coordinates, org unit ids and geometries that a weight matrix depends on."""
+    digest = hashlib.sha256(f"{method}:{WEIGHTS_VERSION}".encode())
+    digest.update(np.ascontiguousarray(lat, dtype="float64").tobytes())
+    digest.update(np.ascontiguousarray(lon, dtype="float64").tobytes())
+    digest.update("\n".join(map(str, org_units["id"])).encode())
+    for wkb in shapely.to_wkb(np.asarray(org_units.geometry)):
+        digest.update(wkb or b"")
+    return digest.hexdigest()[:16]
+
+
+def _centroid_weights(lat: np.ndarray, lon: np.ndarray, geometries: np.ndarray) -> tuple[np.ndarray, ...]:
+    """Return (cell index, org unit index, weight) for cell centres lying inside each org unit.
+
+    Centres on a boundary are covered by every org unit sharing it, and are kept for the first one only,
+    unless an org unit holds them inside. Centres inside overlapping org units are kept for each of them.
+    """
+    points = shapely.points(lon, lat)
+    unit_index, cell_index = shapely.STRtree(points).query(geometries, predicate="covers")
+    on_boundary = shapely.touches(geometries[unit_index], points[cell_index])
+    inside = np.zeros(len(points), dtype=bool)
+    inside[cell_index[~on_boundary]] = True
+    shared = np.flatnonzero(on_boundary & ~inside[cell_index])
+    order = shared[np.lexsort((unit_index[shared], cell_index[shared]))]
+    first = order[np.r_[True, np.diff(cell_index[order]) != 0]] if len(order) else order
+    keep = np.sort(np.concatenate([np.flatnonzero(~on_boundary), first]))
+    return cell_index[keep], unit_index[keep], np.ones(len(keep))
+
+
+def _area_weights(lat: np.ndarray, lon: np.ndarray, geometries: np.ndarray) -> tuple[np.ndarray, ...]:
+    """Return (cell index, org unit index, weight) with weight = covered fraction of the cell * cos(latitude).
+
+    Cells lying fully inside an org unit get fraction 1 without computing an intersection, so exact
+    polygon clipping is only done for the cells along org unit boundaries.
+    """
+    lat_steps = np.diff(np.unique(lat))
+    lon_steps = np.diff(np.unique(lon))
+    lat_res = float(lat_steps.min()) if len(lat_steps) else ERA5_LAND_RESOLUTION
+    lon_res = float(lon_steps.min()) if len(lon_steps) else ERA5_LAND_RESOLUTION
+    cells = shapely.box(lon - lon_res / 2, lat - lat_res / 2, lon + lon_res / 2, lat + lat_res / 2)
+    unit_index, cell_index = shapely.STRtree(cells).query(geometries, predicate="intersects")
+
+    shapely.prepare(geometries)
+    fraction = np.ones(len(cell_index))
+    partial = ~shapely.contains_properly(geometries[unit_index], cells[cell_index])
+    clipped = shapely.intersection(cells[cell_index[partial]], geometries[unit_index[partial]])
+    fraction[partial] = shapely.area(clipped) / (lat_res * lon_res)
+
+    keep = fraction > 0
+    weights = fraction[keep] * np.cos(np.deg2rad(lat[cell_index[keep]]))
+    return cell_index[keep], unit_index[keep], weights
+
+
+def compute_weights(
+    lat: np.ndarray, lon: np.ndarray, org_units: gpd.GeoDataFrame, method: str = "centroid"
+) -> sparse.csr_matrix:
+    """Return a sparse (cells x org units) weight matrix for cell centre coordinates and a set of org units.
+
+    The matrix is built from one vectorized spatial index query rather than one mask per org unit.
+    """
+    geometries = np.asarray(org_units.geometry)
+    if method == "area":
+        cell_index, unit_index, values = _area_weights(lat, lon, geometries)
+    else:
+        cell_index, unit_index, values = _centroid_weights(lat, lon, geometries)
+    return sparse.csr_matrix((values, (cell_index, unit_index)), shape=(len(lat), len(org_units)))
+
+
+def load_weights(
+    lat: np.ndarray,
+    lon: np.ndarray,
+    org_units: gpd.GeoDataFrame,
+    method: str = "centroid",
+    cache_folder: str | None = None,
+) -> sparse.csr_matrix:
+    """Return the weight matrix for a set of cells and org units, cached on disk in cache_folder."""
+    if cache_folder is None:
+        return compute_weights(lat, lon, org_units, method)
+
+    started = time.perf_counter()
+    cache_path = os.path.join(cache_folder, f"weights_{_weights_cache_key(lat, lon, org_units, method)}.npz")
+    if os.path.exists(cache_path):
+        logger.info("Weight matrix cache hit (%s)", cache_path)
+        return sparse.load_npz(cache_path).tocsr()
+
+    weights = compute_weights(lat, lon, org_units, method)
+    os.makedirs(cache_folder, exist_ok=True)
+    tmp_path = cache_path.replace(".npz", ".tmp.npz")
+    sparse.save_npz(tmp_path, weights)
+    os.replace(tmp_path, cache_path)
+    logger.info(
+        "Weight matrix cache miss, computed %s weights for %d cells x %d org units in %.2fs",
+        method,
+        weights.shape[0],
+        weights.shape[1],
+        time.perf_counter() - started,
+    )
+    return weights
+
+
+def _apply_weights(values: np.ndarray, weights: sparse.csr_matrix, how: str, core_ndim: int) -> np.ndarray:
+    """Reduce the trailing cell axes of values to org units.
+
+    Sums and means are one sparse matrix product. Missing cells (NaN, e.g. ocean) are left out of
+    both the total and the weight sum, computed once when the same cells are missing throughout.
+    Max and min reduce each org unit's cells in one vectorized reduceat call. Org units without any
+    valid cell are NaN.
+    """
+    leading_shape = values.shape[: values.ndim - core_ndim]
+    flat = values.reshape(-1, weights.shape[0])
+
+    if how in ("max", "min"):
+        by_unit = weights.tocsc()
+        nonempty = np.diff(by_unit.indptr) > 0
+        result = np.full((len(flat), weights.shape[1]), np.nan)
+        if nonempty.any():
+            reducer = np.fmax if how == "max" else np.fmin
+            result[:, nonempty] = reducer.reduceat(flat[:, by_unit.indices], by_unit.indptr[:-1][nonempty], axis=1)
+        return result.reshape(*leading_shape, weights.shape[1])
+
+    valid = ~np.isnan(flat)
+    if len(flat) and (valid == valid[0]).all():
+        # The same cells are missing at every step (e.g. ocean), so their weight sums are computed once
+        totals = np.asarray(weights.T @ np.where(valid, flat, 0.0).T).T
+        weight_sums = np.broadcast_to(weights.T @ valid[0], totals.shape)
+    else:
+        stacked = np.vstack([np.where(valid, flat, 0.0), valid])
+        reduced = np.asarray(weights.T @ stacked.T).T
+        totals, weight_sums = reduced[: len(flat)], reduced[len(flat) :]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result = totals / weight_sums if how == "mean" else totals
+    result[weight_sums == 0] = np.nan
+    return result.reshape(*leading_shape, weights.shape[1])
+
+
+def _parent_ids(org_units: gpd.GeoDataFrame, level: int) -> np.ndarray:
+    """Return the id of each org unit's ancestor at the given level, read from its hierarchy path."""
+    return org_units["path"].str.split("/").str[level].to_numpy()
+
+
+def rollup_matrix(org_units: gpd.GeoDataFrame, level: int) -> tuple[sparse.csr_matrix, np.ndarray]:
+    """Return a sparse (org units x parents) membership matrix for an ancestor level, and the parent ids."""
+    parent_ids, parent_index = np.unique(_parent_ids(org_units, level), return_inverse=True)
+    membership = sparse.csr_matrix(
+        (np.ones(len(org_units)), (np.arange(len(org_units)), parent_index)),
+        shape=(len(org_units), len(parent_ids)),
+    )
+    return membership, parent_ids
+
+
+def spatial_reduce(
+    da: xr.DataArray,
+    org_units: gpd.GeoDataFrame,
+    how: str,
+    cache_folder: str | None = None,
+    rollup_levels: list[int] | None = None,
+) -> xr.DataArray:
+    """Aggregate a gridded DataArray to org units, returning a DataArray with an "id" dimension.
+
+    Aggregations in SPATIAL_WEIGHT_METHODS use a precomputed sparse weight matrix (cached on disk),
+    other aggregations fall back to earthkit's spatial reduce, which needs a regular grid.
+
+    rollup_levels are coarser levels to also aggregate to through the hierarchy in org_units["path"].
+    Their org units are appended along "id". The parents' weights are the sum of their children's, so all
+    levels are reduced in one pass. This approximates aggregating the parent boundaries directly: children
+    rarely tile their parent exactly, and cells along the edges are weighted by the children's coverage,
+    so parent values typically differ from a direct aggregation by a fraction of a percent.
+    """
+    rollup_levels = rollup_levels or []
+    if how not in SPATIAL_WEIGHT_METHODS:
+        if rollup_levels or "cell" in da.dims:
+            raise ValueError(f"Spatial aggregation '{how}' needs a single org unit level and download region")
+        return transforms.spatial.reduce(da, org_units, mask_dim="id", how=how)
+
+    method, reduction = SPATIAL_WEIGHT_METHODS[how]
+    lat, lon = _cell_coords(da)
+    weights = load_weights(lat, lon, org_units, method, cache_folder)
+    ids = [org_units["id"].to_numpy()]
+    blocks = [weights]
+    for level in rollup_levels:
+        membership, parent_ids = rollup_matrix(org_units, level)
+        blocks.append(weights @ membership)
+        ids.append(parent_ids)
+    if rollup_levels:
+        weights = sparse.hstack(blocks, format="csr")
+
+    core_dims = ["cell"] if "cell" in da.dims else ["latitude", "longitude"]
+    reduced = xr.apply_ufunc(
+        _apply_weights,
+        da,
+        kwargs={"weights": weights, "how": reduction, "core_ndim": len(core_dims)},
+        input_core_dims=[core_dims],
+        output_core_dims=[["id"]],
+        dask="parallelized",
+        output_dtypes=[float],
+        dask_gufunc_kwargs={"output_sizes": {"id": weights.shape[1]}, "allow_rechunk": True},
+    )
+    return reduced.assign_coords(id=np.concatenate(ids)).rename(da.name)
+
+
+# =============================================================================
+# Download Planning
+# =============================================================================
+
+# Cost of one extra CDS request, expressed as the area (square degrees) of data we would rather
+# download than queue another request for. Two download boxes are merged if that adds less area.
+DOWNLOAD_REQUEST_COST = 4.0
+
+ERA5_LAND_DATASET = "reanalysis-era5-land"
+ERA5_LAND_DAILY_DATASET = "derived-era5-land-daily-statistics"
+ERA5_LAND_LAG_DAYS = 7
+ALL_HOURS = list(range(24))
+# Temporal aggregations the daily statistics dataset computes server-side
+DAILY_STATISTICS = {"mean": "daily_mean", "max": "daily_maximum", "min": "daily_minimum"}
+
+BBox = tuple[float, float, float, float]
+# First and last day needed within a month
+DayRange = tuple[pd.Timestamp, pd.Timestamp]
+
+
+def _merge_overlapping(boxes: np.ndarray, gap: float) -> np.ndarray:
+    """Merge (xmin, ymin, xmax, ymax) boxes that overlap or are less than gap apart, until none do."""
+    while len(boxes) > 1:
+        geoms = shapely.box(*(boxes + [-gap / 2, -gap / 2, gap / 2, gap / 2]).T)
+        left, right = shapely.STRtree(geoms).query(geoms, predicate="intersects")
+        adjacency = sparse.coo_matrix((np.ones(len(left)), (left, right)), shape=(len(boxes), len(boxes)))
+        n_groups, labels = csgraph.connected_components(adjacency, directed=False)
+        if n_groups == len(boxes):
+            break
+        merged = np.tile([np.inf, np.inf, -np.inf, -np.inf], (n_groups, 1))
+        for column, reducer in enumerate((np.minimum, np.minimum, np.maximum, np.maximum)):
+            reducer.at(merged[:, column], labels, boxes[:, column])
+        boxes = merged
+    return boxes
+
+
+def plan_download_regions(
+    org_units: gpd.GeoDataFrame, max_regions: int = 1, request_cost: float = DOWNLOAD_REQUEST_COST
+) -> list[BBox]:
+    """Group org units into at most max_regions tight download boxes.
+
+    Each org unit lies entirely within one box. Boxes of touching org units are merged first, so
+    contiguous territory becomes one box and islands or exclaves stay separate. The remaining boxes
+    are merged greedily while merging adds less than request_cost square degrees of extra area,
+    or while there are more boxes than max_regions.
+    """
+    if max_regions <= 1:
+        return [tuple(map(float, org_units.total_bounds))]  # type: ignore[list-item]
+
+    bounds = org_units.geometry.bounds.dropna().to_numpy()
+    boxes = _merge_overlapping(bounds, gap=ERA5_LAND_RESOLUTION)
+    while len(boxes) > 1:
+        # Area each pairwise merge would add on top of the two boxes it replaces
+        merged = np.concatenate(
+            [
+                np.minimum(boxes[:, None, :2], boxes[None, :, :2]),
+                np.maximum(boxes[:, None, 2:], boxes[None, :, 2:]),
+            ],
+            axis=2,
+        )
+        area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        merged_area = (merged[..., 2] - merged[..., 0]) * (merged[..., 3] - merged[..., 1])
+        extra = merged_area - area[:, None] - area[None, :]
+        np.fill_diagonal(extra, np.inf)
+        i, j = np.unravel_index(np.argmin(extra), extra.shape)
+        if extra[i, j] > request_cost and len(boxes) <= max_regions:
+            break
+        boxes = np.vstack([np.delete(boxes, [i, j], axis=0), merged[i, j]])
+        boxes = _merge_overlapping(boxes, gap=0.0)
+
+    total_area = float(((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])).sum())
+    xmin, ymin, xmax, ymax = org_units.total_bounds
+    logger.info(
+        "Planned %d download regions covering %.1f sq. degrees (single bbox: %.1f)",
+        len(boxes),
+        total_area,
+        (xmax - xmin) * (ymax - ymin),
+    )
+    return [tuple(map(float, box)) for box in boxes]  # type: ignore[misc]
+
+
+def snap_bbox(bbox: BBox, resolution: float = ERA5_LAND_RESOLUTION, margin: int = 1) -> BBox:
+    """Snap a bbox outward to the ERA5-Land grid, plus a margin of whole grid cells.
+
+    Small boundary edits in DHIS2 then give the same download bbox, and therefore the same cached files.
+    """
+    xmin, ymin, xmax, ymax = bbox
+    # The small epsilon keeps coordinates that are already on the grid from snapping one cell further
+    return (
+        round((math.floor(xmin / resolution + 1e-6) - margin) * resolution, 4),
+        round((math.floor(ymin / resolution + 1e-6) - margin) * resolution, 4),
+        round((math.ceil(xmax / resolution - 1e-6) + margin) * resolution, 4),
+        round((math.ceil(ymax / resolution - 1e-6) + margin) * resolution, 4),
+    )
+
+
+def _bbox_label(bbox: BBox) -> str:
+    return "_".join(f"{coord:.1f}" for coord in bbox)
+
+
+# =============================================================================
+# Download Cache Manifest
+# =============================================================================
+
+MANIFEST_FILE = "manifest.sqlite"
+
+MANIFEST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    prefix TEXT NOT NULL,
+    variables TEXT NOT NULL,
+    xmin REAL NOT NULL,
+    ymin REAL NOT NULL,
+    xmax REAL NOT NULL,
+    ymax REAL NOT NULL,
+    time_start TEXT NOT NULL,
+    time_end TEXT NOT NULL,
+    request_id TEXT,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    created TEXT NOT NULL,
+    last_used TEXT
+);
+CREATE INDEX IF NOT EXISTS files_prefix_time ON files (prefix, time_start, time_end);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def open_manifest(dirname: str) -> sqlite3.Connection:
+    """Open (or create) the manifest database indexing the cached files in a download folder.
+
+    Each row records what a file holds (variables, lat/lon extent, time range), where it came from
+    (CDS request id) and its size and checksum. Paths are stored relative to the folder.
+    """
+    os.makedirs(dirname, exist_ok=True)
+    manifest = sqlite3.connect(os.path.join(dirname, MANIFEST_FILE))
+    manifest.row_factory = sqlite3.Row
+    manifest.executescript(MANIFEST_SCHEMA)
+    return manifest
+
+
+def _file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def register_file(manifest: sqlite3.Connection, path: str, prefix: str, request_id: str | None = None) -> None:
+    """Add a cached file to the manifest, reading its header once."""
+    with xr.open_dataset(path) as ds:
+        variables = sorted(str(name) for name in ds.data_vars)
+        lat, lon = ds["latitude"].values, ds["longitude"].values
+        times = ds["valid_time"].values
+    with manifest:
+        manifest.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                os.path.basename(path),
+                prefix,
+                ",".join(variables),
+                float(lon.min()),
+                float(lat.min()),
+                float(lon.max()),
+                float(lat.max()),
+                pd.Timestamp(times.min()).isoformat(),
+                pd.Timestamp(times.max()).isoformat(),
+                request_id,
+                os.path.getsize(path),
+                _file_checksum(path),
+                _utc_now(),
+                _utc_now(),
+            ),
+        )
+
+
+def _drop_file(manifest: sqlite3.Connection, dirname: str, name: str, reason: str) -> None:
+    """Remove a damaged file and its manifest row, so the month is downloaded again."""
+    logger.warning("Discarding cached file %s: %s", name, reason)
+    with manifest:
+        manifest.execute("DELETE FROM files WHERE path = ?", (name,))
+    if os.path.exists(os.path.join(dirname, name)):
+        os.remove(os.path.join(dirname, name))
+
+
+def sync_manifest(manifest: sqlite3.Connection, dirname: str, prefix: str) -> None:
+    """Reconcile the manifest with the files on disk.
+
+    Rows of deleted files are removed, files whose size changed (truncated or partially overwritten)
+    are discarded, and cached files the manifest does not know yet (e.g. from before it existed) are
+    indexed. Only new files have their headers read.
+    """
+    rows = manifest.execute("SELECT path, size FROM files WHERE prefix = ?", (prefix,)).fetchall()
+    known = {row["path"]: row["size"] for row in rows}
+    for name, size in known.items():
+        path = os.path.join(dirname, name)
+        if not os.path.exists(path):
+            with manifest:
+                manifest.execute("DELETE FROM files WHERE path = ?", (name,))
+        elif os.path.getsize(path) != size:
+            _drop_file(manifest, dirname, name, f"size changed from {size} to {os.path.getsize(path)} bytes")
+
+    for path in sorted(glob.glob(os.path.join(dirname, f"{prefix}_*.nc"))):
+        if os.path.basename(path) in known:
+            continue
+        try:
+            register_file(manifest, path, prefix)
+            logger.info("Indexed cached file %s", path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Could not index cached file %s: %s", path, e)
+
+
+def find_cached_files(
+    manifest: sqlite3.Connection,
+    needs: dict[pd.Period, DayRange],
+    bbox: BBox,
+    dirname: str,
+    prefix: str,
+    value_cols: list[str],
+    hours: list[int] = ALL_HOURS,
+) -> tuple[list[str], dict[pd.Period, DayRange]]:
+    """Find cached files covering the needed days of each month for a bbox snapped to the grid.
+
+    Returns the files and the needs that no cached file covers. Candidates are looked up in the manifest
+    without opening any file, and may hold a partial month. Files for larger bboxes are reused and subset
+    locally when ingested (see ingest_to_store). Each file used is verified against its checksum first,
+    and a corrupt file is discarded so its days are downloaded again. All files under a prefix hold the
+    same UTC hours of each day.
+    """
+    if not needs:
+        return [], {}
+    months = sorted(needs)
+    tolerance = ERA5_LAND_RESOLUTION / 10
+    xmin, ymin, xmax, ymax = bbox
+    rows = manifest.execute(
+        "SELECT path, variables, time_start, time_end, sha256 FROM files"
+        " WHERE prefix = ? AND time_start < ? AND time_end >= ?"
+        " AND xmin <= ? AND ymin <= ? AND xmax >= ? AND ymax >= ? ORDER BY path",
+        (
+            prefix,
+            (months[-1] + 1).start_time.isoformat(),
+            months[0].start_time.isoformat(),
+            xmin + tolerance,
+            ymin + tolerance,
+            xmax - tolerance,
+            ymax - tolerance,
+        ),
+    ).fetchall()
+    rows = [row for row in rows if set(value_cols) <= set(row["variables"].split(","))]
+
+    files = []
+    missing = {}
+    verified: set[str] = set()
+    for month in months:
+        first_day, last_day = needs[month]
+        need_start = (first_day + pd.Timedelta(hours=hours[0])).isoformat()
+        need_end = (last_day + pd.Timedelta(hours=hours[-1])).isoformat()
+        cached = None
+        for row in list(rows):
+            if row["time_start"] > need_start or row["time_end"] < need_end:
+                continue
+            if row["path"] not in verified:
+                if _file_checksum(os.path.join(dirname, row["path"])) != row["sha256"]:
+                    _drop_file(manifest, dirname, row["path"], "checksum mismatch")
+                    rows.remove(row)
+                    continue
+                verified.add(row["path"])
+            cached = row["path"]
+            break
+        if cached:
+            logger.info("Reusing cached file for %s: %s", month, cached)
+            files.append(os.path.join(dirname, cached))
+        else:
+            missing[month] = needs[month]
+
+    with manifest:
+        manifest.executemany(
+            "UPDATE files SET last_used = ? WHERE path = ?", [(_utc_now(), os.path.basename(path)) for path in files]
+        )
+    record_cache_stats(
+        manifest,
+        hit_days=sum(_n_days(needs[month]) for month in needs if month not in missing),
+        missed_days=sum(map(_n_days, missing.values())),
+    )
+    return files, missing
+
+
+def _n_days(need: DayRange) -> int:
+    return (need[1] - need[0]).days + 1
+
+
+def record_cache_stats(manifest: sqlite3.Connection, hit_days: int = 0, missed_days: int = 0) -> None:
+    """Add to the counts of needed days served from the cache (stores or cached files) and downloaded."""
+    with manifest:
+        manifest.executemany(
+            "INSERT INTO stats VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+            [("hit_days", hit_days), ("missed_days", missed_days)],
+        )
+
+
+def enforce_cache_budget(
+    manifest: sqlite3.Connection,
+    dirname: str,
+    max_bytes: int,
+    keep: set[str],
+    keep_from: pd.Timestamp | None = None,
+) -> None:
+    """Report the download cache size and hit rate, and evict least recently used files over max_bytes.
+
+    The hit rate is the share of needed days found in a store or a cached file (see record_cache_stats).
+    The budget covers the downloaded months and the time-series stores. Months are evicted first, then
+    stores are trimmed from their oldest day (see trim_store), least recently written first. Files in keep
+    (those needed by the current import) are never evicted, stores in keep only lose days before
+    keep_from, and other stores may be removed entirely. max_bytes <= 0 means no budget.
+    """
+    rows = manifest.execute("SELECT path, size FROM files ORDER BY last_used").fetchall()
+    store_paths = sorted(glob.glob(os.path.join(dirname, "store_*.nc")), key=os.path.getmtime)
+    total = sum(row["size"] for row in rows) + sum(os.path.getsize(path) for path in store_paths)
+    stats = dict(manifest.execute("SELECT name, value FROM stats").fetchall())
+    requested = stats.get("hit_days", 0) + stats.get("missed_days", 0)
+    logger.info(
+        "Download cache: %d files and %d stores, %.2f GB (budget %s), %.0f%% of %d days served from cache",
+        len(rows),
+        len(store_paths),
+        total / 1e9,
+        f"{max_bytes / 1e9:.2f} GB" if max_bytes > 0 else "unlimited",
+        100 * stats.get("hit_days", 0) / requested if requested else 0,
+        requested,
+    )
+    if max_bytes <= 0 or total <= max_bytes:
+        return
+
+    keep = {os.path.basename(path) for path in keep}
+    for row in rows:
+        if total <= max_bytes:
+            break
+        if row["path"] in keep:
+            continue
+        path = os.path.join(dirname, row["path"])
+        with manifest:
+            manifest.execute("DELETE FROM files WHERE path = ?", (row["path"],))
+        if os.path.exists(path):
+            os.remove(path)
+        total -= row["size"]
+        logger.info("Evicted %s from the download cache", row["path"])
+    for path in store_paths:
+        if total <= max_bytes:
+            break
+        if os.path.basename(path) not in keep:
+            total -= os.path.getsize(path)
+            os.remove(path)
+            logger.info("Evicted store %s from the download cache", os.path.basename(path))
+        elif keep_from is not None:
+            total -= trim_store(path, keep_from, total - max_bytes)
+    if total > max_bytes:
+        logger.warning("Download cache is over budget (%.2f GB), remaining files are needed now", total / 1e9)
+
+
+# =============================================================================
+# ERA5-Land Downloads
+# =============================================================================
+
+
+def month_file(dirname: str, prefix: str, bbox: BBox, month: pd.Period) -> str:
+    """Path of a downloaded month, saved as <prefix>_<bbox>_<YYYY-MM>.nc (possibly holding only some days)."""
+    return os.path.join(dirname, f"{prefix}_{_bbox_label(bbox)}_{month}.nc")
+
+
+def last_available_day() -> pd.Timestamp:
+    """Last UTC day expected to be complete in ERA5-Land, which is published with roughly a week of lag."""
+    return pd.Timestamp.today().normalize() - pd.Timedelta(days=ERA5_LAND_LAG_DAYS)
+
+
+def month_needs(days: list[pd.Timestamp]) -> dict[pd.Period, DayRange]:
+    """Group days by month, as the first and last day needed in each month."""
+    needs: dict[pd.Period, DayRange] = {}
+    for day in days:
+        month = day.to_period("M")
+        first, last = needs.get(month, (day, day))
+        needs[month] = (min(first, day), max(last, day))
+    return needs
+
+
+def days_to_download(
+    manifest: sqlite3.Connection,
+    dirname: str,
+    path: str,
+    need: DayRange,
+    value_cols: list[str],
+    hours: list[int] = ALL_HOURS,
+) -> list[int]:
+    """Days of the month to request so the month file at path covers the needed days.
+
+    An existing file for the month is extended in place, so only the days it lacks are requested (including
+    any gap between its days and the needed ones, to keep it contiguous). A file that is corrupt or holds
+    other variables than value_cols is discarded and the needed days are requested from scratch, as the
+    days appended to it would only hold the variables requested now.
+    """
+    first_day, last_day = need
+    row = manifest.execute(
+        "SELECT variables, time_start, time_end, sha256 FROM files WHERE path = ?", (os.path.basename(path),)
+    ).fetchone()
+    if row is not None:
+        if set(value_cols) != set(row["variables"].split(",")):
+            _drop_file(manifest, dirname, os.path.basename(path), "other variables, downloading it again")
+            row = None
+        elif _file_checksum(path) != row["sha256"]:
+            _drop_file(manifest, dirname, os.path.basename(path), "checksum mismatch")
+            row = None
+    if row is None:
+        return [day.day for day in pd.date_range(first_day, last_day)]
+
+    # Whole days held by the file
+    held_first = (pd.Timestamp(row["time_start"]) - pd.Timedelta(hours=hours[0])).ceil("D")
+    held_last = (pd.Timestamp(row["time_end"]) - pd.Timedelta(hours=hours[-1])).floor("D")
+    days = pd.date_range(min(first_day, held_first), max(last_day, held_last))
+    return [day.day for day in days if not held_first <= day <= held_last]
+
+
+def era5_land_request(
+    month: pd.Period, bbox: BBox, variables: list[str], days: list[int], hours: list[int] = ALL_HOURS
+) -> dict:
+    """Build the CDS request for days of one month of ERA5-Land hourly data (the API serves a month at a time)."""
+    xmin, ymin, xmax, ymax = bbox
+    return {
+        "variable": variables,
+        "year": str(month.year),
+        "month": [f"{month.month:02d}"],
+        "day": [f"{day:02d}" for day in days],
+        "time": [f"{hour:02d}:00" for hour in hours],
+        "area": [ymax, xmin, ymin, xmax],
+        "data_format": "netcdf",
+        "download_format": "unarchived",
+    }
+
+
+def era5_land_daily_request(
+    month: pd.Period, bbox: BBox, variables: list[str], days: list[int], statistic: str, timezone_offset: int
+) -> dict:
+    """Build the CDS request for days of one month of an ERA5-Land daily statistic, over local days."""
+    xmin, ymin, xmax, ymax = bbox
+    return {
+        "variable": variables,
+        "year": str(month.year),
+        "month": [f"{month.month:02d}"],
+        "day": [f"{day:02d}" for day in days],
+        "daily_statistic": DAILY_STATISTICS[statistic],
+        "time_zone": f"utc{timezone_offset:+03d}:00",
+        "frequency": "1_hourly",
+        "area": [ymax, xmin, ymin, xmax],
+    }
+
+
+def _download_month(
+    bbox: BBox,
+    month: pd.Period,
+    days: list[int],
+    path: str,
+    variables: list[str],
+    hours: list[int] = ALL_HOURS,
+    statistic: str | None = None,
+    timezone_offset: int = 0,
+) -> str:
+    """Submit one monthly request, wait for CDS to process it and download the result to path.part.
+
+    With a statistic, the daily statistic over local days is requested instead of hourly data.
+    Only the download happens here, so it can run in a worker thread; the file is moved into place
+    by _save_month. Returns the CDS request id.
+    """
+    client = Client(
+        url=os.getenv("CDSAPI_URL"),
+        key=os.getenv("CDSAPI_KEY"),
+        retry_after=float(os.getenv("CDSAPI_RETRY_AFTER", "120")),
+    )
+    if statistic:
+        request = era5_land_daily_request(month, bbox, variables, days, statistic, timezone_offset)
+        remote = client.submit(ERA5_LAND_DAILY_DATASET, request)
+    else:
+        remote = client.submit(ERA5_LAND_DATASET, era5_land_request(month, bbox, variables, days, hours))
+    logger.info("Submitted %s (%d days) for %s (request %s)", month, len(days), _bbox_label(bbox), remote.request_id)
+    started = time.perf_counter()
+    # Download to a temporary name so an interrupted download never looks like a cached month
+    remote.download(f"{path}.part")
+    logger.info("Downloaded %s in %.0fs: %s", month, time.perf_counter() - started, path)
+    return remote.request_id
+
+
+def _save_month(path: str) -> None:
+    """Move a downloaded month (path.part) into place, merged with the days path already holds.
+
+    NetCDF files are only opened and written from the main thread, as the netCDF4/HDF5 library is not
+    thread-safe.
+    """
+    if os.path.exists(path):
+        with xr.open_dataset(path) as held, xr.open_dataset(f"{path}.part") as new:
+            xr.concat([held, new], dim="valid_time").sortby("valid_time").to_netcdf(f"{path}.tmp")
+        os.remove(f"{path}.part")
+    else:
+        os.replace(f"{path}.part", f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+
+
+def download_months(
+    requests: list[tuple[BBox, pd.Period, list[int], str]],
+    variables: list[str],
+    max_in_flight: int = 1,
+    manifest: sqlite3.Connection | None = None,
+    prefix: str = "",
+    hours: list[int] = ALL_HOURS,
+    statistic: str | None = None,
+    timezone_offset: int = 0,
+) -> list[tuple[BBox, pd.Period, list[int], str]]:
+    """Download (bbox, month, days, path) requests from CDS, keeping up to max_in_flight jobs queued at a time.
+
+    All months are queued up front and a new request is submitted as soon as one completes, so CDS
+    always has our next job waiting instead of each month queueing only after the previous one is
+    saved. CDS limits the jobs each user can have running, so a higher max_in_flight mostly keeps
+    requests waiting in its queue. Only the given UTC hours of each day are requested, or with a
+    statistic, that daily statistic over the local days of timezone_offset (see _download_month).
+    Completed files are registered in the manifest, if given, under prefix.
+    Returns the requests that were downloaded. If any month fails, the others are still saved before
+    the error is raised, so a rerun only requests what is missing.
+    """
+    if not requests:
+        return []
+
+    logger.info("Downloading %d months with up to %d requests in flight", len(requests), max_in_flight)
+    for dirname in {os.path.dirname(path) for _, _, _, path in requests}:
+        os.makedirs(dirname or ".", exist_ok=True)
+    downloaded = []
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as executor:
+        futures = {
+            executor.submit(_download_month, bbox, month, days, path, variables, hours, statistic, timezone_offset): (
+                bbox,
+                month,
+                days,
+                path,
+            )
+            for bbox, month, days, path in requests
+        }
+        for future in as_completed(futures):
+            try:
+                request_id = future.result()
+                _save_month(futures[future][3])
+                downloaded.append(futures[future])
+                if manifest is not None:
+                    register_file(manifest, futures[future][3], prefix, request_id=request_id)
+            except Exception:
+                logger.exception("Download failed for %s", futures[future][1])
+                failed.append(str(futures[future][1]))
+    if failed:
+        raise RuntimeError(f"Failed to download {len(failed)} of {len(requests)} months: {sorted(failed)}")
+    return downloaded
+
+
+def _subset_to_bbox(ds: xr.Dataset, bbox: BBox) -> xr.Dataset:
+    """Cut a dataset down to a bbox, rounding coordinates so files from different requests align."""
+    xmin, ymin, xmax, ymax = bbox
+    tolerance = ERA5_LAND_RESOLUTION / 10
+    ds = ds.assign_coords(latitude=ds["latitude"].round(4), longitude=ds["longitude"].round(4))
+    lat_slice = slice(ymin - tolerance, ymax + tolerance)
+    if ds["latitude"].size > 1 and ds["latitude"][0] > ds["latitude"][-1]:
+        # ERA5 latitudes are stored north to south
+        lat_slice = slice(ymax + tolerance, ymin - tolerance)
+    return ds.sel(latitude=lat_slice, longitude=slice(xmin - tolerance, xmax + tolerance))
+
+
+# =============================================================================
+# Time-Series Store
+# =============================================================================
+
+# Chunk layout of the store: a month of hours for a tile of cells, suited to per-cell temporal reductions
+STORE_CHUNKS = {"valid_time": 744, "latitude": 32, "longitude": 32}
+STORE_TIME_UNITS = "hours since 1970-01-01 00:00:00"
+
+
+def store_file(dirname: str, prefix: str, bbox: BBox) -> str:
+    """Path of the time-series store of a download region, saved as store_<prefix>_<bbox>.nc."""
+    return os.path.join(dirname, f"store_{prefix}_{_bbox_label(bbox)}.nc")
+
+
+def _store_times(path: str, value_cols: list[str]) -> pd.DatetimeIndex | None:
+    """Time steps in a store, or None if there is no store with exactly these variables."""
+    if not os.path.exists(path):
+        return None
+    with xr.open_dataset(path) as ds:
+        if set(ds.data_vars) != set(value_cols):
+            return None
+        return pd.DatetimeIndex(ds["valid_time"].values)
+
+
+def stored_days(path: str, value_cols: list[str], hours_per_day: int = 24) -> set[pd.Timestamp]:
+    """Days held in full (all hours_per_day hours) by a store, read from its time coordinate only."""
+    times = _store_times(path, value_cols)
+    if times is None:
+        return set()
+    counts = times.normalize().value_counts()
+    return {day for day, count in counts.items() if count == hours_per_day}
+
+
+def _store_encoding(ds: xr.Dataset) -> dict:
+    chunks = {dim: min(size, ds.sizes[dim]) for dim, size in STORE_CHUNKS.items()}
+    encoding: dict[str, dict] = {
+        str(name): {
+            "dtype": "float32",
+            "zlib": True,
+            "complevel": 4,
+            "shuffle": True,
+            "chunksizes": tuple(chunks[str(dim)] for dim in ds[name].dims),
+        }
+        for name in ds.data_vars
+    }
+    encoding["valid_time"] = {"units": STORE_TIME_UNITS, "dtype": "int64", "chunksizes": (chunks["valid_time"],)}
+    return encoding
+
+
+def ingest_to_store(path: str, bbox: BBox, files: list[str], value_cols: list[str]) -> None:
+    """Add the months in files to the time-series store of a download region.
+
+    The store is a single NetCDF4 file with an unlimited time dimension, compressed and chunked for
+    time-series reads (STORE_CHUNKS). Hours after the last stored hour are appended in place. A backfill
+    before the stored range rewrites the store once with the hours in order, and a store holding other
+    variables than value_cols is replaced.
+    """
+    if not files:
+        return
+    started = time.perf_counter()
+    months = [
+        _subset_to_bbox(xr.open_dataset(file), bbox)[value_cols].drop_vars(["number", "expver"], errors="ignore")
+        for file in files
+    ]
+    times = _store_times(path, value_cols)
+    if times is not None:
+        # Skip hours the store already holds
+        months = [month.sel(valid_time=~month["valid_time"].isin(times.values)) for month in months]
+        months = [month for month in months if month.sizes["valid_time"]]
+    if not months:
+        return
+    months.sort(key=lambda month: month["valid_time"].values[0])
+
+    if times is not None and len(times) and months[0]["valid_time"].values[0] > times[-1]:
+        with netCDF4.Dataset(path, "a") as nc:
+            for month in months:
+                start = nc.dimensions["valid_time"].size
+                end = start + month.sizes["valid_time"]
+                epoch_hours = (month["valid_time"].values - np.datetime64("1970-01-01")) // np.timedelta64(1, "h")
+                nc["valid_time"][start:end] = epoch_hours
+                for value_col in value_cols:
+                    nc[value_col][start:end] = month[value_col].transpose("valid_time", "latitude", "longitude").values
+        action = "Appended"
+    else:
+        if times is not None:
+            months.append(xr.open_dataset(path, chunks={}))
+        ds = xr.concat(months, dim="valid_time").sortby("valid_time")
+        ds.to_netcdf(f"{path}.tmp", format="NETCDF4", unlimited_dims=["valid_time"], encoding=_store_encoding(ds))
+        action = "Wrote"
+    for month in months:
+        month.close()
+    if action == "Wrote":
+        os.replace(f"{path}.tmp", path)
+    logger.info("%s %d files to store %s (%.1fs)", action, len(files), path, time.perf_counter() - started)
+
+
+def trim_store(path: str, keep_from: pd.Timestamp, excess: int) -> int:
+    """Drop the oldest whole days of a store to free about excess bytes, never a day from keep_from on.
+
+    The store is rewritten once without those days, or removed if none are left. Returns the bytes freed.
+    """
+    size = os.path.getsize(path)
+    with xr.open_dataset(path) as ds:
+        times = pd.DatetimeIndex(ds["valid_time"].values)
+        if not len(times):
+            return 0
+        # Hours compress about evenly, so the size of a day is estimated from the store's average
+        n_hours = min(max(math.ceil(excess * len(times) / size), 1), len(times))
+        cutoff = min(times[n_hours - 1].normalize() + pd.Timedelta(days=1), keep_from.normalize())
+        if cutoff <= times[0]:
+            return 0
+        kept = ds.sel(valid_time=ds["valid_time"] >= cutoff)
+        if kept.sizes["valid_time"]:
+            kept.load().to_netcdf(
+                f"{path}.tmp", format="NETCDF4", unlimited_dims=["valid_time"], encoding=_store_encoding(kept)
+            )
+    if os.path.exists(f"{path}.tmp"):
+        os.replace(f"{path}.tmp", path)
+        freed = size - os.path.getsize(path)
+    else:
+        os.remove(path)
+        freed = size
+    logger.info("Trimmed store %s to start on %s", os.path.basename(path), cutoff.date())
+    return freed
+
+
+def open_store(path: str, first_hour: pd.Timestamp, last_hour: pd.Timestamp) -> xr.Dataset:
+    """Lazily open the hours first_hour to last_hour of a time-series store, in its on-disk chunks."""
+    ds = xr.open_dataset(path, chunks={})
+    return ds.sel(valid_time=slice(first_hour, last_hour))
+
+
+def combine_regions(opened: list[xr.Dataset]) -> xr.Dataset:
+    """Combine the datasets of several download regions into one.
+
+    A single region is kept as a regular grid. Several regions are stacked along a "cell"
+    dimension holding only their cells, so the empty space between them is never materialized.
+    Cells downloaded by more than one region are kept once.
+    """
+    if len(opened) == 1:
+        return opened[0]
+
+    ds = xr.concat([region.stack(cell=("latitude", "longitude")).reset_index("cell") for region in opened], dim="cell")
+    cell_keys = np.column_stack([ds["latitude"].values.round(4), ds["longitude"].values.round(4)])
+    _, first = np.unique(cell_keys, axis=0, return_index=True)
+    return ds.isel(cell=np.sort(first))
 
 
 # =============================================================================
@@ -83,126 +1214,917 @@ DHIS2_DRY_RUN = os.getenv("DHIS2_DRY_RUN", "true").lower() == "true"
 # =============================================================================
 
 
+class Target(NamedTuple):
+    """A data element to import, and how its values are computed from an ERA5-Land variable."""
+
+    data_element_id: str
+    variable: str
+    value_col: str
+    is_cumulative: bool
+    from_units: str
+    to_units: str
+    temporal_aggregation: str
+    period_type: str = "DAILY"
+
+
+def build_targets(**settings: list) -> list[Target]:
+    """Pair up per-target settings (keyword per Target field) into targets.
+
+    Each setting holds one value per target, or a single value used for every target.
+    """
+    count = max(len(values) for values in settings.values())
+    for field, values in settings.items():
+        if len(values) not in (1, count):
+            raise ValueError(f"Expected 1 or {count} values for {field}, got {len(values)}: {values}")
+    return [
+        Target(**{field: values[i] if len(values) > 1 else values[0] for field, values in settings.items()})
+        for i in range(count)
+    ]
+
+
+def _deaccumulate_block(values: np.ndarray, hours: np.ndarray) -> np.ndarray:
+    """Hourly increments of accumulated values along the last axis, reading each value once.
+
+    ERA5-Land accumulates from 00 UTC: the 01 UTC step holds only its own hour and the 00 UTC step
+    the whole previous day, so every step except 01 UTC is the difference with the step before it.
+    The first step has no predecessor and is NaN, unless it is 01 UTC.
+    """
+    # apply_ufunc moves time last; work on the time-first layout the data is stored in instead
+    values = np.moveaxis(values, -1, 0)
+    increments = np.empty_like(values)
+    np.subtract(values[1:], values[:-1], out=increments[1:])
+    increments[0] = np.nan
+    for step in np.flatnonzero(hours == 1):
+        increments[step] = values[step]
+    return np.moveaxis(increments, 0, -1)
+
+
+def deaccumulate(da: xr.DataArray) -> xr.DataArray:
+    """Convert an ERA5-Land accumulated variable (accumulated since 00 UTC) to hourly increments.
+
+    The time axis is kept whole within each spatial chunk so the kernel sees every step after its
+    predecessor. The result has the same time steps as da.
+    """
+    if da.chunks is not None:
+        da = da.chunk({"valid_time": -1})
+    return xr.apply_ufunc(
+        _deaccumulate_block,
+        da,
+        da["valid_time"].dt.hour,
+        input_core_dims=[["valid_time"], ["valid_time"]],
+        output_core_dims=[["valid_time"]],
+        dask="parallelized",
+        output_dtypes=[da.dtype],
+    ).transpose(*da.dims)
+
+
+def daily_accumulation(
+    da: xr.DataArray, first_day: pd.Timestamp, last_day: pd.Timestamp, timezone_offset: int | np.ndarray
+) -> xr.DataArray:
+    """Daily totals of an ERA5-Land accumulated variable for local days, read from a few time steps.
+
+    The 00 UTC step holds the total of the previous UTC day. A local day ends at 24 - offset hours UTC,
+    so its total is that day's closing 00 UTC step, corrected by the accumulation at the local day's
+    end hour minus the same hour a day earlier. Only two or three steps are read per day instead of 24.
+
+    timezone_offset can also hold one offset per org unit series of da (along "id", see org_unit_offsets).
+    """
+    local_days = pd.date_range(first_day, last_day)
+    if np.ndim(timezone_offset):
+        # Each series ends its days at its own hour, so the steps are gathered by position for all series at once
+        offsets = np.asarray(timezone_offset) * np.timedelta64(1, "h")
+        series_ends = local_days.values[:, None] + (np.timedelta64(24, "h") - offsets)[None, :]
+        closing = series_ends.astype("datetime64[D]").astype(series_ends.dtype)
+        values = da.transpose("valid_time", "id").values
+        steps = pd.DatetimeIndex(da["valid_time"].values)
+
+        def take(times: np.ndarray) -> np.ndarray:
+            positions = steps.get_indexer(times.ravel()).reshape(times.shape)
+            return np.where(positions >= 0, np.take_along_axis(values, np.maximum(positions, 0), axis=0), np.nan)
+
+        correction = take(series_ends) - take(series_ends - np.timedelta64(24, "h"))
+        series_totals = take(closing) + np.where(series_ends != closing, correction, 0)
+        return xr.DataArray(
+            series_totals,
+            coords={"valid_time": local_days, "id": da["id"].values},
+            dims=("valid_time", "id"),
+            name=da.name,
+        )
+    ends = local_days + pd.Timedelta(hours=24 - timezone_offset)
+    totals = da.sel(valid_time=ends.floor("D"))
+    if ends[0].hour:
+        later = da.sel(valid_time=ends).data
+        earlier = da.sel(valid_time=ends - pd.Timedelta(days=1)).data
+        totals = totals.copy(data=totals.data + later - earlier)
+    return totals.assign_coords(valid_time=local_days)
+
+
+# Temporal aggregations daily_reduce_many computes together in one pass, others are left to earthkit
+FUSED_TEMPORAL_AGGREGATIONS = ("mean", "sum", "max", "min")
+
+
+def _daily_reduce_block(values: np.ndarray, starts: np.ndarray, hows: list[str]) -> np.ndarray:
+    """Reduce the last (time) axis of values to the days beginning at the step indices in starts.
+
+    Every aggregation in hows is computed from the same pass, stacked along a new second to last axis.
+    Missing values are skipped, and days without any value are NaN.
+    """
+    # apply_ufunc moves time last; work on the time-first layout the data is stored in instead
+    values = np.moveaxis(values, -1, 0)
+    valid = ~np.isnan(values)
+    counts = np.add.reduceat(valid, starts, axis=0, dtype=np.int64)
+    sums = None
+    results = []
+    for how in hows:
+        if how in ("max", "min"):
+            result = (np.fmax if how == "max" else np.fmin).reduceat(values, starts, axis=0)
+        else:
+            if sums is None:
+                sums = np.add.reduceat(np.where(valid, values, 0), starts, axis=0, dtype=np.float64)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result = sums / counts if how == "mean" else sums
+        results.append(np.where(counts > 0, result, np.nan).astype(values.dtype))
+    return np.moveaxis(np.stack(results), (0, 1), (-2, -1))
+
+
+def daily_reduce_many(da: xr.DataArray, hows: list[str], timezone_offset: int) -> xr.Dataset:
+    """Aggregate hourly values to local days with several temporal aggregations, reading each chunk once.
+
+    Each step counts towards the local day of its valid_time shifted by timezone_offset hours, like
+    earthkit's daily_reduce with time_shift. Returns a Dataset with one variable per aggregation.
+    """
+    local_days = (da["valid_time"] + pd.Timedelta(hours=timezone_offset)).dt.floor("D").values
+    starts = np.flatnonzero(np.r_[True, local_days[1:] != local_days[:-1]])
+    if da.chunks is not None:
+        da = da.chunk({"valid_time": -1})
+    reduced = xr.apply_ufunc(
+        _daily_reduce_block,
+        da,
+        kwargs={"starts": starts, "hows": hows},
+        input_core_dims=[["valid_time"]],
+        output_core_dims=[["statistic", "day"]],
+        dask="parallelized",
+        output_dtypes=[da.dtype],
+        dask_gufunc_kwargs={"output_sizes": {"statistic": len(hows), "day": len(starts)}},
+    )
+    reduced = reduced.rename(day="valid_time").assign_coords(valid_time=local_days[starts], statistic=hows)
+    return reduced.to_dataset(dim="statistic").transpose(*da.dims)
+
+
+def org_unit_offsets(
+    org_units: gpd.GeoDataFrame, rollup_levels: list[int], default: int | str, mapping: dict[str, int]
+) -> np.ndarray:
+    """Time zone offset in hours of every series spatial_reduce returns: the org units, then their parents.
+
+    Org units take the offset of the closest org unit on their path in mapping, or else default, which is
+    "auto" to use the centroid longitude (15 degrees per hour). Org units without a geometry then take the
+    most common offset of the others. Parents take their own mapped offset, or else the most common offset
+    of their org units.
+    """
+    if default == "auto":
+        centroids = shapely.centroid(np.asarray(org_units.geometry))
+        located = ~(shapely.is_missing(centroids) | shapely.is_empty(centroids))
+        offsets = np.zeros(len(org_units), dtype=int)
+        offsets[located] = np.round(shapely.get_x(centroids[located]) / 15)
+        if not located.all():
+            fallback = int(pd.Series(offsets[located]).mode().get(0, 0))
+            offsets[~located] = fallback
+            logger.warning("%d org units have no geometry, their offset is UTC%+d", (~located).sum(), fallback)
+    else:
+        offsets = np.full(len(org_units), int(default))
+    for i, path in enumerate(org_units["path"].str.split("/")):
+        mapped = [mapping[org_unit_id] for org_unit_id in path if org_unit_id in mapping]
+        if mapped:
+            offsets[i] = mapped[-1]
+
+    series_offsets = [offsets]
+    for level in rollup_levels:
+        parents = pd.Series(offsets).groupby(_parent_ids(org_units, level)).agg(lambda values: values.mode()[0])
+        series_offsets.append(np.array([mapping.get(parent_id, offset) for parent_id, offset in parents.items()]))
+    return np.concatenate(series_offsets)
+
+
+def local_time(da: xr.DataArray, offsets: np.ndarray) -> xr.DataArray:
+    """Shift hourly org unit series (valid_time, id) to local time, each series by its own offset in hours.
+
+    One gather over a (local hour, series) index array moves all time zones at once, instead of
+    aggregating the gridded data once per offset. Hours a series has no step for are NaN, so the
+    result can be aggregated to days with daily_reduce_many and an offset of 0.
+    """
+    steps = pd.DatetimeIndex(da["valid_time"].values)
+    local_steps = pd.date_range(
+        steps[0] + pd.Timedelta(hours=int(offsets.min())), steps[-1] + pd.Timedelta(hours=int(offsets.max())), freq="h"
+    )
+    utc = local_steps.values[:, None] - (offsets * np.timedelta64(1, "h"))[None, :]
+    positions = steps.get_indexer(utc.ravel()).reshape(utc.shape)
+    values = da.transpose("valid_time", "id").values
+    shifted = np.where(positions >= 0, np.take_along_axis(values, np.maximum(positions, 0), axis=0), np.nan)
+    return xr.DataArray(
+        shifted, coords={"valid_time": local_steps, "id": da["id"].values}, dims=("valid_time", "id"), name=da.name
+    )
+
+
+# DHIS2 period types -> pandas period frequency (ISO weeks start on Monday, so they end on Sunday)
+PERIOD_FREQUENCIES = {"DAILY": "D", "WEEKLY": "W-SUN", "MONTHLY": "M", "YEARLY": "Y"}
+# Temporal aggregations whose value over a period follows from the daily values
+PERIOD_AGGREGATIONS = ("sum", "mean", "max", "min")
+
+
+def period_start(day: str, period_type: str) -> str:
+    """Return the first day (ISO date) of the period of period_type holding day."""
+    return pd.Period(day, freq=PERIOD_FREQUENCIES[period_type]).start_time.date().isoformat()
+
+
+def latest_imported_week(client: DHIS2Client, data_element_id: str, level: int, start_date: str) -> dict | None:
+    """Return the latest ISO week since start_date with values for org units at a level, or None.
+
+    Returned like dhis2-client's latest period lookup, as {"id", "startDate", "endDate"}. That lookup only
+    parses two-digit weeks (2025W01), while DHIS2 names weeks 1 to 9 e.g. 2025W1, so weeks are read here.
+    """
+    org_unit_ids = list(_org_units_metadata(client, level))
+    weeks: set[tuple[int, int]] = set()
+    for i in range(0, len(org_unit_ids), 200):
+        response = client.get(
+            "/api/dataValueSets",
+            params={
+                "dataElement": data_element_id,
+                "orgUnit": org_unit_ids[i : i + 200],
+                "startDate": start_date,
+                "endDate": date.today().isoformat(),
+                "paging": "false",
+            },
+        )
+        for row in response.get("dataValues") or []:
+            year, _, week = row["period"].partition("W")
+            if row.get("value") not in (None, "") and week.isdigit():
+                weeks.add((int(year), int(week)))
+    if not weeks:
+        return None
+    year, week = max(weeks)
+    return {
+        "id": f"{year}W{week}",
+        "startDate": date.fromisocalendar(year, week, 1).isoformat(),
+        "endDate": date.fromisocalendar(year, week, 7).isoformat(),
+    }
+
+
+def aggregate_periods(da: xr.DataArray, period_type: str, how: str) -> pd.DataFrame:
+    """Aggregate daily org unit values (valid_time, id) to DHIS2 periods (rows) by org unit (columns).
+
+    Only periods with a value on every day are kept, others are NaN, so a period is imported once it is
+    complete and never left partial. Weekly periods are ISO weeks (e.g. 2025W1), monthly 202501 and
+    yearly 2025.
+    """
+    daily = pd.DataFrame(
+        da.transpose("valid_time", "id").values,
+        index=pd.DatetimeIndex(da["valid_time"].values),
+        columns=da["id"].values,
+    )
+    grouped = daily.groupby(daily.index.to_period(PERIOD_FREQUENCIES[period_type]))
+    aggregated = grouped.agg(how)
+    starts = aggregated.index.start_time
+    lengths = (aggregated.index.end_time.normalize() - starts).days + 1
+    aggregated = aggregated.where(grouped.count().to_numpy() == lengths.to_numpy()[:, None])
+    if period_type == "WEEKLY":
+        iso = starts.isocalendar()
+        aggregated.index = iso["year"].astype(str) + "W" + iso["week"].astype(str)
+    else:
+        aggregated.index = starts.strftime("%Y%m" if period_type == "MONTHLY" else "%Y")
+    return aggregated
+
+
+@functools.lru_cache
+def unit_conversion(from_units: str, to_units: str) -> tuple[float, float] | None:
+    """Resolve a unit conversion to (scale, offset) with to = from * scale + offset, or None if not affine.
+
+    Nearly every conversion (m to mm, K to degC, J m**-2 to W m**-2) is affine, so metpy is asked once
+    per unit pair and the values are converted with plain NumPy instead of a pint Quantity per call.
+    """
+    offset, one, thousand = (units.Quantity(value, from_units).to(to_units).magnitude for value in (0.0, 1.0, 1000.0))
+    scale = one - offset
+    if not math.isclose(thousand, 1000.0 * scale + offset, rel_tol=1e-9, abs_tol=1e-9):
+        return None
+    return scale, offset
+
+
+def convert_units(values: np.ndarray, from_units: str, to_units: str) -> np.ndarray:
+    """Convert values from from_units to to_units, in place where the conversion is affine."""
+    conversion = unit_conversion(from_units, to_units)
+    if conversion is None:
+        return (values * units(from_units)).to(to_units).magnitude
+    scale, offset = conversion
+    if scale != 1.0:
+        np.multiply(values, scale, out=values)
+    if offset != 0.0:
+        np.add(values, offset, out=values)
+    return values
+
+
+def data_value_rows(
+    data_element_id: str, periods: Iterable[str], org_unit_ids: Iterable[str], values: np.ndarray
+) -> Iterator[str]:
+    """Yield the JSON of each data value in a (period, org unit) array, skipping NaN.
+
+    The JSON around periods and org unit ids is formatted once, so a value only costs formatting its
+    number, and no dict is built per value.
+    """
+    suffix = f',"dataElement":{json.dumps(data_element_id)}}}'
+    prefixes = [f'{{"orgUnit":{json.dumps(org_unit_id)},"period":' for org_unit_id in org_unit_ids]
+    for period, row in zip(periods, values):
+        middle = f'{json.dumps(period)},"value":"'
+        present = ~np.isnan(row)
+        for i, value in zip(np.flatnonzero(present).tolist(), row[present].tolist()):
+            yield f'{prefixes[i]}{middle}{format_value_for_dhis2(value)}"{suffix}'
+
+
+def data_value_batches(rows: Iterable[str], batch_size: int) -> Iterator[tuple[bytes, int]]:
+    """Serialize data value JSON rows into dataValueSets payloads of at most batch_size values each."""
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, batch_size)):
+        yield b'{"dataValues":[' + ",".join(batch).encode() + b"]}", len(batch)
+
+
+def dhis2_session(settings: ClientSettings) -> httpx.Client:
+    """Return an HTTP session for posting serialized payloads, built from the same settings as DHIS2Client.
+
+    DHIS2Client.post only takes a dict to serialize, so payloads that are already serialized are posted
+    through this session instead. Use it as a context manager, so its connections are closed.
+    """
+    return httpx.Client(
+        base_url=settings.base_url.rstrip("/"),
+        auth=(settings.username or "", settings.password or ""),
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        timeout=httpx.Timeout(settings.timeout, connect=settings.connect_timeout),
+        verify=settings.verify_ssl,
+    )
+
+
+def post_data_values(session: httpx.Client, payload: bytes, dry_run: bool) -> dict:
+    """POST a serialized dataValueSets payload and return the import summary response."""
+    path = "/api/dataValueSets"
+    response = session.post(path, content=payload, params={"dryRun": str(dry_run).lower()})
+    if response.status_code // 100 != 2:
+        try:
+            body = response.json()
+        except ValueError:
+            body = {"message": response.text}
+        raise DHIS2HTTPError(response.status_code, path, body)
+    return response.json()
+
+
+def needed_hours(targets: list[Target], timezone_offset: int, instant_step: int = 1) -> list[int]:
+    """UTC hours of each day that the targets' daily values are computed from.
+
+    Daily totals of cumulative variables only need the 00 UTC step and the step at the local day's end
+    (see daily_accumulation); other aggregations of cumulative variables need every increment.
+    Instantaneous variables are sampled every instant_step hours from local midnight.
+    """
+    hours: set[int] = set()
+    for target in targets:
+        if target.is_cumulative and target.temporal_aggregation == "sum":
+            hours |= {0, -timezone_offset % 24}
+        elif target.is_cumulative:
+            hours |= set(ALL_HOURS)
+        else:
+            hours |= {(local_hour - timezone_offset) % 24 for local_hour in range(0, 24, instant_step)}
+    return sorted(hours)
+
+
+# Cost per value of each aggregation stage on chunked store data, relative to a temporal pass (measured
+# with the sparse weight matrix product of spatial_reduce, at the org unit counts of levels 2 to 4)
+TEMPORAL_COST = 1.0
+DEACCUMULATE_COST = 0.9
+SPATIAL_COST = 1.5
+
+
+def commutes(spatial_aggregation: str, temporal_aggregation: str, is_cumulative: bool) -> bool:
+    """Whether reducing to org units before de-accumulating and aggregating temporally gives the same daily values.
+
+    True when both aggregations are linear (sums and means, with the same cells missing at every step,
+    as with ERA5-Land's fixed land mask), or both take the max or the min of instantaneous values.
+    De-accumulation is a difference of steps, so it only commutes with sums and means.
+    """
+    if spatial_aggregation not in SPATIAL_WEIGHT_METHODS:
+        return False
+    reduction = SPATIAL_WEIGHT_METHODS[spatial_aggregation][1]
+    linear = reduction in ("sum", "mean") and temporal_aggregation in ("sum", "mean")
+    return linear or (not is_cumulative and reduction == temporal_aggregation)
+
+
+def spatial_first(
+    spatial_aggregation: str,
+    temporal_aggregation: str,
+    is_cumulative: bool,
+    n_cells: int,
+    n_series: int,
+    n_steps: int,
+    n_days: int,
+) -> bool:
+    """Whether to reduce hourly data to org units before de-accumulating and aggregating it temporally.
+
+    Only when both orders give the same daily values (see commutes). Reducing space first runs the temporal
+    stages over n_series org unit series instead of n_cells grid cells, but reduces all n_steps hours to
+    org units instead of n_days days. The order with the lower estimated cost is used, so in practice
+    mostly de-accumulated variables go space first.
+    """
+    if not commutes(spatial_aggregation, temporal_aggregation, is_cumulative):
+        return False
+    temporal_cost = TEMPORAL_COST + DEACCUMULATE_COST * is_cumulative
+    temporal_first_cost = n_steps * n_cells * temporal_cost + n_days * n_cells * SPATIAL_COST
+    spatial_first_cost = n_steps * n_cells * SPATIAL_COST + n_steps * n_series * temporal_cost
+    return spatial_first_cost < temporal_first_cost
+
+
+def aggregate_days(
+    da: xr.DataArray,
+    is_cumulative: bool,
+    hows: list[str],
+    first_day: pd.Timestamp,
+    last_day: pd.Timestamp,
+    timezone_offset: int | np.ndarray,
+) -> dict[str, xr.DataArray]:
+    """Aggregate an hourly variable to the local days first_day to last_day, once for each aggregation in hows.
+
+    timezone_offset is one offset for all of da, or one per org unit series of da (along "id"), in which
+    case every series is shifted to its local time first (see local_time).
+    """
+    daily: dict[str, xr.DataArray] = {}
+    if is_cumulative and "sum" in hows:
+        # Daily totals of cumulative variables such as precipitation are read from the 00 UTC steps
+        logger.info("Reading daily totals of cumulative %s...", da.name)
+        daily["sum"] = daily_accumulation(da, first_day, last_day, timezone_offset)
+    hows = [how for how in hows if how not in daily]
+    if hows:
+        # Other aggregations of cumulative variables
+        # ...have to be de-accumulated before proceeding
+        if is_cumulative:
+            logger.info("Converting cumulative %s to incremental variable...", da.name)
+            da = deaccumulate(da)
+            # Label each increment by the start of its hour, so the 00 UTC step counts towards the day before
+            da = da.assign_coords(valid_time=da["valid_time"] - pd.Timedelta(hours=1))
+        time_shift = 0
+        if np.ndim(timezone_offset):
+            da = local_time(da, np.asarray(timezone_offset))
+        else:
+            time_shift = int(timezone_offset)
+
+        # Temporal aggregation
+        # Mean, sum, max and min are computed together, from one read of each chunk of hourly data
+        logger.info("Aggregating %s temporally (%s)...", da.name, ", ".join(hows))
+        fused = [how for how in hows if how in FUSED_TEMPORAL_AGGREGATIONS]
+        if fused:
+            ds_daily = daily_reduce_many(da, fused, time_shift)
+            daily.update({how: ds_daily[how] for how in fused})
+        for how in hows:
+            if how not in fused:
+                daily[how] = transforms.temporal.daily_reduce(
+                    da, how=how, time_shift={"hours": time_shift}, remove_partial_periods=False
+                )
+    return {how: values.sel(valid_time=slice(first_day, last_day)) for how, values in daily.items()}
+
+
+def load_era5_land(
+    org_units: gpd.GeoDataFrame,
+    days: list[pd.Timestamp],
+    first_step: pd.Timestamp,
+    last_step: pd.Timestamp,
+    variables: list[str],
+    value_cols: list[str],
+    download_folder: str,
+    download_prefix: str,
+    hours: list[int] = ALL_HOURS,
+    statistic: str | None = None,
+    timezone_offset: int = 0,
+    download_regions: int = 1,
+    download_concurrency: int = 1,
+    in_use: set[str] | None = None,
+) -> xr.Dataset | None:
+    """Make sure the days are in the download regions' stores and lazily open first_step to last_step.
+
+    Hourly data holds the given UTC hours of each day. With a statistic, daily statistics for the local days
+    of timezone_offset are downloaded instead, one step per day. Returns None if no store has data.
+    The files and stores used are added to in_use, to keep them out of the cache eviction until the
+    returned dataset is read (see enforce_cache_budget).
+    """
+    # Each region's bbox is snapped to the ERA5-Land grid. Days already in the region's store are not
+    # looked up again, cached files covering the other days are reused, and the rest is downloaded
+    # Missing months of all regions are requested together, several at a time
+    os.makedirs(download_folder, exist_ok=True)
+    # The manifest in the download folder indexes what each cached file holds
+    region_files: dict[BBox, list[str]] = {}
+    stores: dict[BBox, str] = {}
+    requests: list[tuple[BBox, pd.Period, list[int], str]] = []
+    with contextlib.closing(open_manifest(download_folder)) as manifest:
+        sync_manifest(manifest, download_folder, download_prefix)
+        for bbox in plan_download_regions(org_units, max_regions=download_regions):
+            snapped = snap_bbox(bbox)
+            stores[snapped] = store_file(download_folder, download_prefix, snapped)
+            stored = stored_days(stores[snapped], value_cols, hours_per_day=len(hours))
+            record_cache_stats(manifest, hit_days=sum(day in stored for day in days))
+            cached, missing = find_cached_files(
+                manifest,
+                month_needs([day for day in days if day not in stored]),
+                bbox=snapped,
+                dirname=download_folder,
+                prefix=download_prefix,
+                value_cols=value_cols,
+                hours=hours,
+            )
+            region_files[snapped] = cached
+            for month, need in missing.items():
+                path = month_file(download_folder, download_prefix, snapped, month)
+                requests.append(
+                    (snapped, month, days_to_download(manifest, download_folder, path, need, value_cols, hours), path)
+                )
+        logger.info(
+            "Reusing %d cached files, %d months to download", sum(map(len, region_files.values())), len(requests)
+        )
+        downloaded = download_months(
+            requests,
+            variables,
+            max_in_flight=download_concurrency,
+            manifest=manifest,
+            prefix=download_prefix,
+            hours=hours,
+            statistic=statistic,
+            timezone_offset=timezone_offset,
+        )
+        for bbox, _, _, path in downloaded:
+            region_files[bbox].append(path)
+
+        # Add new days to each region's store
+        for bbox, path in stores.items():
+            ingest_to_store(path, bbox, sorted(region_files[bbox]), value_cols)
+    if in_use is not None:
+        in_use.update(path for files in region_files.values() for path in files)
+        in_use.update(stores.values())
+
+    # Read the import window lazily from the stores
+    logger.info("Loading data from stores...")
+    opened = []
+    for path in stores.values():
+        if os.path.exists(path):
+            region = open_store(path, first_step, last_step)
+            if region.sizes["valid_time"]:
+                opened.append(region)
+
+    # Load all regions into a single dataset
+    return combine_regions(opened) if opened else None
+
+
 def import_era5_land_to_dhis2(
     client: DHIS2Client,
-    variable: str,
-    data_element_id: str,
-    value_col: str,
-    is_cumulative: str,
-    from_units: str,
-    to_units: str,
-    temporal_aggregation: str,
+    session: httpx.Client,
+    targets: list[Target],
     spatial_aggregation: str,
     start_date: str,
     end_date: str,
     download_folder: str,
     download_prefix: str,
-    timezone_offset: int,
-    org_unit_level: int,
+    timezone_offset: int | str,
+    org_unit_levels: list[int],
     dry_run: bool = False,
+    geometry_cache: bool = True,
+    download_regions: int = 1,
+    download_concurrency: int = 1,
+    cache_max_gb: float = 0,
+    download_hours: str = "all",
+    instant_hour_step: int = 1,
+    source: str = "hourly",
+    timezone_offsets: dict[str, int] | None = None,
+    import_batch_size: int = 50000,
 ) -> None:
-    """Download ERA5-Land data and import aggregated values into DHIS2."""
-    variables = [variable]
+    """Download ERA5-Land data and import aggregated values into DHIS2.
+
+    All targets share one download: their variables are requested together and processed from a single
+    opened dataset, and their values are imported together in payloads of at most import_batch_size values,
+    each serialized only when it is posted through session (see dhis2_session). With download_hours
+    "needed", only the hours the daily values are computed from are downloaded (see needed_hours). With
+    source "daily", daily means, maxima and minima are downloaded precomputed from the ERA5-Land daily
+    statistics dataset instead.
+    Org units can be in different time zones (see org_unit_offsets), which are all imported in one pass.
+    """
+    if download_hours not in ("all", "needed"):
+        raise ValueError(f"Unknown download hours '{download_hours}', use 'all' or 'needed'")
+    if source not in ("hourly", "daily"):
+        raise ValueError(f"Unknown source '{source}', use 'hourly' or 'daily'")
+    for target in targets:
+        if target.period_type not in PERIOD_FREQUENCIES:
+            raise ValueError(f"Unknown period type '{target.period_type}', use one of {', '.join(PERIOD_FREQUENCIES)}")
+        if target.period_type != "DAILY" and target.temporal_aggregation not in PERIOD_AGGREGATIONS:
+            raise ValueError(
+                f"{target.period_type.capitalize()} values cannot be aggregated from daily "
+                f"{target.temporal_aggregation}, use one of {', '.join(PERIOD_AGGREGATIONS)}"
+            )
 
     # Get org units from DHIS2
+    # Only the finest level is fetched and aggregated, coarser levels are rolled up through the hierarchy
+    finest_level = max(org_unit_levels)
+    rollup_levels = sorted(set(org_unit_levels) - {finest_level}, reverse=True)
+    if rollup_levels and spatial_aggregation not in SPATIAL_WEIGHT_METHODS:
+        raise ValueError(f"Spatial aggregation '{spatial_aggregation}' cannot be rolled up, import one level at a time")
     logger.info("Fetching organisation units from DHIS2...")
-    org_units_geojson = client.get_org_units_geojson(level=org_unit_level)
-    org_units = gpd.read_file(json.dumps(org_units_geojson))
-    logger.info("Found %d organisation units at level %d", len(org_units), org_unit_level)
+    org_units = load_org_units(client, finest_level, cache_folder=download_folder if geometry_cache else None)
+    logger.info("Found %d organisation units at level %d", len(org_units), finest_level)
+
+    # Time zone offset of every org unit series, rolled up levels included
+    series_offsets = org_unit_offsets(org_units, rollup_levels, timezone_offset, timezone_offsets or {})
+    zones = sorted(set(series_offsets.tolist()))
+    if len(zones) > 1:
+        counts = pd.Series(series_offsets).value_counts()
+        logger.info("Org units span %s", ", ".join(f"UTC{zone:+d} ({counts[zone]})" for zone in zones))
 
     # Get last imported period to determine where to start
-    last_imported_response = client.analytics_latest_period_for_level(de_uid=data_element_id, level=org_unit_level)
-    last_imported_period = last_imported_response["existing"]
-    last_imported_month_string = last_imported_period["id"][:6] if last_imported_period else None
-
-    if last_imported_month_string:
-        logger.info("Last imported period: %s", last_imported_month_string)
-        # Convert DHIS2 period format (YYYYMM) to ISO date format (YYYY-MM-DD)
-        last_imported_date = f"{last_imported_month_string[:4]}-{last_imported_month_string[4:6]}-01"
-        # Start from the later of configured start date or last imported month
-        import_start_date = max(last_imported_date, start_date)
-    else:
-        logger.info("No existing data found")
-        import_start_date = start_date
+    # With several levels or data elements, start from the one that is furthest behind
+    # Data elements with coarser periods start at the beginning of their first period to import
+    # Each data element and level is only imported from its own start date (see level_starts below)
+    period_types = {target.data_element_id: target.period_type for target in targets}
+    level_start_dates: dict[tuple[str, int], str] = {}
+    for data_element_id, period_type in period_types.items():
+        for level in org_unit_levels:
+            if period_type == "WEEKLY":
+                last_imported_period = latest_imported_week(client, data_element_id, level, start_date)
+            else:
+                last_imported_period = client.analytics_latest_period_for_level(de_uid=data_element_id, level=level)[
+                    "existing"
+                ]
 
-    logger.info("Import will start at %s", import_start_date)
-    logger.info("Import will end at %s", end_date)
+            if last_imported_period:
+                logger.info(
+                    "Last imported period for %s at level %d: %s", data_element_id, level, last_imported_period["id"]
+                )
+                # Start from the later of configured start date or the first day after the last imported period
+                next_date = (pd.Timestamp(last_imported_period["endDate"]) + pd.Timedelta(days=1)).date().isoformat()
+                level_start_date = max(next_date, start_date)
+            else:
+                logger.info("No existing data found for %s at level %d", data_element_id, level)
+                level_start_date = start_date
+            level_start_dates[data_element_id, level] = period_start(level_start_date, period_type)
+    import_start_date = min(level_start_dates.values())
 
-    # Download ERA5 data (with file-based caching)
-    logger.info("Downloading ERA5-Land data...")
-    os.makedirs(download_folder, exist_ok=True)
-    files = era5_land.hourly.download(
-        start=import_start_date,
-        end=end_date,
-        bbox=tuple(org_units.total_bounds),  # type: ignore[arg-type]
-        dirname=download_folder,
-        prefix=download_prefix,
-        variables=variables,
-    )
+    # Targets whose daily values CDS computes server-side with the daily source, the others are reduced from hours
+    daily_targets = [
+        target
+        for target in targets
+        if source == "daily" and not target.is_cumulative and target.temporal_aggregation in DAILY_STATISTICS
+    ]
+    hourly_targets = [target for target in targets if target not in daily_targets]
 
-    if not files:
-        logger.info("No new data files to process")
+    # Only import local days whose hours are all expected to be published in ERA5-Land
+    # Cumulative variables also need the 00 UTC step closing the last day at offset 0 (see daily_accumulation)
+    # With several time zones, the westernmost one ends its days last
+    closing_step = int(any(target.is_cumulative for target in hourly_targets))
+    first_day = pd.Timestamp(import_start_date)
+    available_until = last_available_day() + pd.Timedelta(hours=min(zones) - closing_step)
+    last_day = min(pd.Timestamp(end_date), available_until.floor("D"))
+    if first_day > last_day:
+        logger.info("No new days to import, ERA5-Land is expected up to %s UTC", last_available_day().date())
         return
 
-    logger.info("Downloaded %d files", len(files))
-
-    # Load all files into a single dataset
-    logger.info("Loading data from files...")
-    ds_hourly = xr.open_mfdataset(files)
-
-    # Cumulative variables such as precipitation
-    # ...have to be de-accumulated before proceeding
-    if is_cumulative:
-        logger.info('Converting cumulative to incremental variable...')
-        # convert cumulative to diffs
-        ds_diffs = ds_hourly.diff(dim='valid_time')
-        # replace negative diffs with original cumulative (the hours where accumulation resets)
-        ds_diffs = xr.where(ds_diffs < 0, ds_hourly.isel(valid_time=slice(1, None)), ds_diffs)
-        ds_hourly = ds_diffs
-
-    # Temporal aggregation
-    logger.info("Aggregating temporally...")
-    ds_daily = transforms.temporal.daily_reduce(
-        ds_hourly[value_col],
-        how=temporal_aggregation,
-        time_shift={"hours": timezone_offset},
-        remove_partial_periods=False,
-    )
+    logger.info("Import will start at %s", first_day.date())
+    logger.info("Import will end at %s", last_day.date())
 
-    # Spatial aggregation
-    logger.info("Aggregating to organisation units...")
-    ds_org_units = transforms.spatial.reduce(
-        ds_daily,
+    # Download ERA5 data (with file-based caching), shared by all targets of a source
+    # The files and stores of every load are kept until all of them are read
+    in_use: set[str] = set()
+    load = functools.partial(
+        load_era5_land,
         org_units,
-        mask_dim="id",
-        how=spatial_aggregation,
+        download_folder=download_folder,
+        download_regions=download_regions,
+        download_concurrency=download_concurrency,
+        in_use=in_use,
     )
-    dataframe = ds_org_units.to_dataframe().reset_index()
-
-    # Apply unit conversion using metpy
-    if to_units != from_units:
-        logger.info("Applying unit conversion from %s to %s...", from_units, to_units)
-        values_with_units = dataframe[value_col].values * units(from_units)
-        converted = values_with_units.to(to_units).magnitude
-        dataframe[value_col] = converted
-    else:
-        logger.info("No unit conversion needed")
-
-    # Create DHIS2 payload
-    logger.info("Creating payload with %d values...", len(dataframe))
-    payload = dataframe_to_dhis2_json(
-        df=dataframe,
-        org_unit_col="id",
-        period_col="valid_time",
-        value_col=value_col,
-        data_element_id=data_element_id,
+    reduce_to_org_units = functools.partial(
+        spatial_reduce,
+        org_units=org_units,
+        how=spatial_aggregation,
+        cache_folder=download_folder,
+        rollup_levels=rollup_levels,
     )
+    # Rolled up levels are reduced along with the finest level, each adding a series per parent
+    n_series = len(org_units) + sum(len(set(_parent_ids(org_units, level))) for level in rollup_levels)
+    daily_values: dict[tuple[str, bool, str], xr.DataArray] = {}
+    # Daily values already reduced to org units, because their spatial aggregation could run first
+    reduced_keys: set[tuple[str, bool, str]] = set()
+    # Daily values computed in one pass, to be loaded together
+    fused_batches: list[list[tuple[str, bool, str]]] = []
+
+    def by_time_zone(aggregate: Callable[[int], dict[str, xr.DataArray]]) -> dict[str, xr.DataArray]:
+        """Run a gridded daily aggregation once per time zone, keeping each org unit series' own zone."""
+        combined: dict[str, xr.DataArray] = {}
+        for zone in zones:
+            in_zone = xr.DataArray(series_offsets == zone, dims="id")
+            for how, values in aggregate(zone).items():
+                reduced = reduce_to_org_units(values)
+                combined[how] = reduced.where(in_zone, combined[how]) if how in combined else reduced
+        return combined
+
+    if hourly_targets:
+        # UTC hours making up the local days, up to the step ending the last hour of the last day
+        first_hour = first_day - pd.Timedelta(hours=max(zones))
+        last_hour = last_day + pd.Timedelta(days=1, hours=closing_step - 1) - pd.Timedelta(hours=min(zones))
+
+        # Hours to download, and the UTC days holding any of them. Files and stores holding only some hours
+        # are kept under their own prefix, so they are never mistaken for complete days
+        hours = ALL_HOURS
+        hourly_prefix = download_prefix
+        if download_hours == "needed":
+            hours = sorted(set().union(*(needed_hours(hourly_targets, zone, instant_hour_step) for zone in zones)))
+        if hours != ALL_HOURS:
+            hourly_prefix = f"{download_prefix}-h{'-'.join(f'{hour:02d}' for hour in hours)}"
+            logger.info("Downloading %d of 24 hours per day (UTC %s)", len(hours), ", ".join(map(str, hours)))
+        steps = pd.date_range(first_hour, last_hour, freq="h")
+        days = list(pd.DatetimeIndex(steps[steps.hour.isin(hours)].floor("D")).unique())
+
+        logger.info("Downloading ERA5-Land hourly data...")
+        ds_hourly = load(
+            days,
+            first_hour,
+            last_hour,
+            variables=list(dict.fromkeys(target.variable for target in hourly_targets)),
+            value_cols=list(dict.fromkeys(target.value_col for target in hourly_targets)),
+            download_prefix=hourly_prefix,
+            hours=hours,
+        )
+
+        if ds_hourly is not None:
+            # Aggregate each distinct (variable, cumulative) once, to every temporal aggregation its targets need
+            groups = dict.fromkeys((t.value_col, t.is_cumulative) for t in hourly_targets)
+            for value_col, is_cumulative in groups:
+                hows = list(
+                    dict.fromkeys(
+                        t.temporal_aggregation
+                        for t in hourly_targets
+                        if (t.value_col, t.is_cumulative) == (value_col, is_cumulative)
+                    )
+                )
+                ds_values = ds_hourly[value_col]
+                keys = [(value_col, is_cumulative, how) for how in hows]
+                fused_batches.append(keys)
+
+                # Reduce to org units first where that gives the same daily values for less work
+                # With several time zones that is how each org unit gets its own local days (see local_time),
+                # aggregations that do not commute are then computed on the grid once per time zone instead
+                n_steps = ds_values.sizes["valid_time"]
+                n_cells = ds_values.size // max(n_steps, 1)
+                n_days = (last_day - first_day).days + 1
+                temporal_hows = [how for how in hows if not (is_cumulative and how == "sum")]
+                if len(zones) > 1:
+                    reduced_first = all(commutes(spatial_aggregation, how, is_cumulative) for how in hows)
+                else:
+                    reduced_first = bool(temporal_hows) and all(
+                        spatial_first(spatial_aggregation, how, is_cumulative, n_cells, n_series, n_steps, n_days)
+                        for how in temporal_hows
+                    )
+                if reduced_first:
+                    logger.info("Aggregating hourly %s to organisation units...", value_col)
+                    ds_values = reduce_to_org_units(ds_values)
+                    offsets: int | np.ndarray = series_offsets if len(zones) > 1 else zones[0]
+                    group_values = aggregate_days(ds_values, is_cumulative, hows, first_day, last_day, offsets)
+                elif len(zones) > 1:
+                    logger.info("Aggregating %s once per time zone...", value_col)
+                    group_values = by_time_zone(
+                        functools.partial(aggregate_days, ds_values, is_cumulative, hows, first_day, last_day)
+                    )
+                    reduced_first = True
+                else:
+                    group_values = aggregate_days(ds_values, is_cumulative, hows, first_day, last_day, zones[0])
+                for key in keys:
+                    daily_values[key] = group_values[key[2]]
+                    if reduced_first:
+                        reduced_keys.add(key)
+
+    # Daily statistics computed by CDS for the local days, one download per statistic and time zone
+    def load_statistic(
+        statistic: str, variables: list[str], value_cols: list[str], zone: int
+    ) -> dict[str, xr.DataArray]:
+        """Download a daily statistic for the local days of zone, by value column."""
+        ds_statistic = load(
+            list(pd.date_range(first_day, last_day)),
+            first_day,
+            last_day,
+            variables=variables,
+            value_cols=value_cols,
+            download_prefix=f"{download_prefix}-{DAILY_STATISTICS[statistic]}-utc{zone:+03d}",
+            hours=[0],
+            statistic=statistic,
+            timezone_offset=zone,
+        )
+        return {} if ds_statistic is None else {value_col: ds_statistic[value_col] for value_col in value_cols}
+
+    for statistic in dict.fromkeys(target.temporal_aggregation for target in daily_targets):
+        statistic_targets = [target for target in daily_targets if target.temporal_aggregation == statistic]
+        logger.info("Downloading ERA5-Land %s...", DAILY_STATISTICS[statistic].replace("_", " "))
+        aggregate = functools.partial(
+            load_statistic,
+            statistic,
+            list(dict.fromkeys(target.variable for target in statistic_targets)),
+            list(dict.fromkeys(target.value_col for target in statistic_targets)),
+        )
+        statistic_values = by_time_zone(aggregate) if len(zones) > 1 else aggregate(zones[0])
+        for target in statistic_targets:
+            key = (target.value_col, target.is_cumulative, statistic)
+            if target.value_col in statistic_values:
+                daily_values[key] = statistic_values[target.value_col]
+                if len(zones) > 1:
+                    reduced_keys.add(key)
+
+    # Spatial aggregation
+    # Daily values computed in one pass are reduced and loaded together, so their hourly data is read once
+    org_unit_values: dict[tuple[str, bool, str], xr.DataArray] = {}
+    batched = {key for batch in fused_batches for key in batch}
+    for batch in fused_batches + [[key] for key in daily_values if key not in batched]:
+        ds_org_units = {}
+        for key in batch:
+            if key in reduced_keys:
+                ds_org_units[key[2]] = daily_values[key]
+            else:
+                logger.info("Aggregating %s (%s) to organisation units...", key[0], key[2])
+                ds_org_units[key[2]] = reduce_to_org_units(daily_values[key])
+        loaded = xr.Dataset(ds_org_units).compute()
+        for key in batch:
+            org_unit_values[key] = loaded[key[2]].rename(key[0])
+
+    # All loaded data is read now, keep the months and stores within the disk budget
+    # Stores in use keep every day from the earliest hour any load read
+    with contextlib.closing(open_manifest(download_folder)) as manifest:
+        enforce_cache_budget(
+            manifest,
+            download_folder,
+            max_bytes=int(cache_max_gb * 1e9),
+            keep=in_use,
+            keep_from=min(first_day, first_day - pd.Timedelta(hours=max(zones))),
+        )
+    if not daily_values:
+        logger.info("No new data files to process")
+        return
+
+    # (period, org unit) values of every target, turned into payload rows only as they are posted
+    tables: list[tuple[str, Iterable[str], Iterable[str], np.ndarray]] = []
+    n_values = 0
+    # Level of every org unit series, so each is imported from its own data element and level's start date
+    series_levels = dict.fromkeys(org_units["id"], finest_level)
+    for level in rollup_levels:
+        series_levels.update(dict.fromkeys(_parent_ids(org_units, level), level))
+    for i, target in enumerate(targets):
+        key = (target.value_col, target.is_cumulative, target.temporal_aggregation)
+        if key not in org_unit_values:
+            continue
+        da_org_units = org_unit_values[key]
+
+        # Apply unit conversion on the (day, org unit) values,
+        # in place unless a later target still needs the unconverted values
+        if target.to_units != target.from_units:
+            logger.info("Applying unit conversion from %s to %s...", target.from_units, target.to_units)
+            shared = any(
+                (later.value_col, later.is_cumulative, later.temporal_aggregation) == key for later in targets[i + 1 :]
+            )
+            values = da_org_units.values.copy() if shared else da_org_units.values
+            da_org_units = da_org_units.copy(data=convert_units(values, target.from_units, target.to_units))
+        else:
+            logger.info("No unit conversion needed")
+
+        # The import starts at the earliest start date of all targets, leave out this target's earlier days
+        series_starts = pd.DatetimeIndex(
+            [
+                level_start_dates[target.data_element_id, series_levels[org_unit_id]]
+                for org_unit_id in da_org_units["id"].values
+            ]
+        )
+        if (series_starts > first_day).any():
+            da_org_units = da_org_units.where(
+                da_org_units["valid_time"] >= xr.DataArray(series_starts.values, dims="id")
+            )
+
+        if target.period_type != "DAILY":
+            # Coarser periods are aggregated from the converted daily values, complete periods only
+            periods = aggregate_periods(da_org_units, target.period_type, target.temporal_aggregation)
+            table = (target.data_element_id, periods.index, periods.columns, periods.to_numpy())
+        else:
+            da_org_units = da_org_units.transpose("valid_time", "id")
+            days = pd.DatetimeIndex(da_org_units["valid_time"].values).strftime("%Y%m%d")
+            table = (target.data_element_id, days, da_org_units["id"].values, da_org_units.values)
+        count = int(np.count_nonzero(~np.isnan(table[3])))
+        logger.info(
+            "Creating payload with %d %s values for %s...", count, target.period_type.lower(), target.data_element_id
+        )
+        tables.append(table)
+        n_values += count
+    if not n_values:
+        logger.info("No complete periods to import")
+        return
 
-    # Import to DHIS2
+    # Import to DHIS2, one batch of values at a time
     mode = "DRY RUN" if dry_run else "IMPORTING"
-    logger.info("%s...", mode)
-    res = client.post("/api/dataValueSets", json=payload, params={"dryRun": str(dry_run).lower()})
-    logger.info("Result: %s", res["response"]["importCount"])
+    import_count: dict[str, int] = {}
+    rows = itertools.chain.from_iterable(data_value_rows(*table) for table in tables)
+    for payload, count in data_value_batches(rows, import_batch_size):
+        logger.info("%s %d of %d values...", mode, count, n_values)
+        res = post_data_values(session, payload, dry_run)
+        for name, value in res["response"]["importCount"].items():
+            import_count[name] = import_count.get(name, 0) + value
+    logger.info("Result: %s", import_count)
 
 
 # =============================================================================
@@ -252,30 +2174,45 @@ def main() -> None:
     logger.info("Connected to DHIS2 version: %s", info["version"])
 
     logger.info("Starting import: %s to %s", DHIS2_START_DATE, DHIS2_END_DATE)
-    logger.info("Variable: %s", DHIS2_VARIABLE)
+    logger.info("Variable: %s", ", ".join(DHIS2_VARIABLE))
     logger.info("Download folder: %s", DHIS2_DOWNLOAD_FOLDER)
     logger.info("Dry run: %s", DHIS2_DRY_RUN)
 
     # Run import (DHIS2_DATA_ELEMENT_ID is validated above so assert it's not None)
     assert DHIS2_DATA_ELEMENT_ID is not None
-    import_era5_land_to_dhis2(
-        client,
+    targets = build_targets(
+        data_element_id=DHIS2_DATA_ELEMENT_ID.split(","),
         variable=DHIS2_VARIABLE,
-        data_element_id=DHIS2_DATA_ELEMENT_ID,
         value_col=DHIS2_VALUE_COL,
         is_cumulative=DHIS2_IS_CUMULATIVE,
         from_units=DHIS2_FROM_UNITS,
         to_units=DHIS2_TO_UNITS,
         temporal_aggregation=DHIS2_TEMPORAL_AGGREGATION,
-        spatial_aggregation=DHIS2_SPATIAL_AGGREGATION,
-        start_date=DHIS2_START_DATE,
-        end_date=DHIS2_END_DATE,
-        download_folder=DHIS2_DOWNLOAD_FOLDER,
-        download_prefix=DHIS2_DOWNLOAD_PREFIX,
-        timezone_offset=DHIS2_TIMEZONE_OFFSET,
-        org_unit_level=DHIS2_ORG_UNIT_LEVEL,
-        dry_run=DHIS2_DRY_RUN,
+        period_type=DHIS2_PERIOD_TYPE,
     )
+    with dhis2_session(cfg) as session:
+        import_era5_land_to_dhis2(
+            client,
+            session,
+            targets=targets,
+            spatial_aggregation=DHIS2_SPATIAL_AGGREGATION,
+            start_date=DHIS2_START_DATE,
+            end_date=DHIS2_END_DATE,
+            download_folder=DHIS2_DOWNLOAD_FOLDER,
+            download_prefix=DHIS2_DOWNLOAD_PREFIX,
+            timezone_offset=DHIS2_TIMEZONE_OFFSET if DHIS2_TIMEZONE_OFFSET == "auto" else int(DHIS2_TIMEZONE_OFFSET),
+            org_unit_levels=DHIS2_ORG_UNIT_LEVEL,
+            dry_run=DHIS2_DRY_RUN,
+            geometry_cache=DHIS2_GEOMETRY_CACHE,
+            download_regions=DHIS2_DOWNLOAD_REGIONS,
+            download_concurrency=DHIS2_DOWNLOAD_CONCURRENCY,
+            cache_max_gb=DHIS2_CACHE_MAX_GB,
+            download_hours=DHIS2_DOWNLOAD_HOURS,
+            instant_hour_step=DHIS2_INSTANT_HOUR_STEP,
+            source=DHIS2_SOURCE,
+            timezone_offsets=DHIS2_TIMEZONE_OFFSETS,
+            import_batch_size=DHIS2_IMPORT_BATCH_SIZE,
+        )
 
     logger.info("Done!")
 
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Benchmark building org unit GeoDataFrames from GeoJSON.
+
+Compares the old json.dumps + gpd.read_file round-trip with the direct
+org_units_from_geojson() loader in main.py, on synthetic boundary sets sized
+like DHIS2 levels 2, 3 and 4.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+import geopandas as gpd
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import org_units_from_geojson  # noqa: E402
+
+# (level, number of org units, vertices per boundary)
+LEVEL_SIZES = [(2, 15, 2000), (3, 150, 600), (4, 1500, 200)]
+
+
+def synthetic_geojson(n_units: int, n_vertices: int, seed: int = 0) -> dict:
+    """Return a FeatureCollection of jagged, non-overlapping polygons laid out on a grid."""
+    rng = np.random.default_rng(seed)
+    side = math.ceil(math.sqrt(n_units))
+    size = 10.0 / side
+    angles = np.linspace(0, 2 * np.pi, n_vertices, endpoint=False)
+    features = []
+    for i in range(n_units):
+        cx = 30.0 + (i % side + 0.5) * size
+        cy = -5.0 + (i // side + 0.5) * size
+        radius = size * 0.45 * rng.uniform(0.8, 1.0, n_vertices)
+        ring = np.column_stack([cx + radius * np.cos(angles), cy + radius * np.sin(angles)])
+        ring = np.vstack([ring, ring[:1]]).round(6).tolist()
+        features.append(
+            {
+                "type": "Feature",
+                "id": f"OU{i:08d}",
+                "geometry": {"type": "Polygon", "coordinates": [ring]},
+                "properties": {"name": f"Org unit {i}", "level": 0},
+            }
+        )
+    return {"type": "FeatureCollection", "features": features}
+
+
+def read_file_roundtrip(geojson: dict) -> gpd.GeoDataFrame:
+    """The previous loader: serialize the parsed dict and parse it again through GDAL."""
+    return gpd.read_file(json.dumps(geojson))
+
+
+def measure(func, geojson: dict, repeat: int) -> tuple[float, float]:
+    """Return best wall time in seconds and peak Python heap in MB."""
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(geojson)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    func(geojson)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per loader (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'level':>5} {'units':>6} {'MB':>6} {'read_file s':>12} {'direct s':>9} {'speedup':>8} {'peak MB':>15}")
+    for level, n_units, n_vertices in LEVEL_SIZES:
+        geojson = synthetic_geojson(n_units, n_vertices)
+        size_mb = len(json.dumps(geojson)) / 1e6
+        old_time, old_peak = measure(read_file_roundtrip, geojson, args.repeat)
+        new_time, new_peak = measure(org_units_from_geojson, geojson, args.repeat)
+        print(
+            f"{level:>5} {n_units:>6} {size_mb:>6.1f} {old_time:>12.3f} {new_time:>9.3f} "
+            f"{old_time / new_time:>7.1f}x {old_peak:>6.1f} -> {new_peak:<6.1f}"
+        )
+    print("Peak memory is the Python heap (tracemalloc); GDAL's own allocations in read_file are not included.")
+
+
+if __name__ == "__main__":
+    main()
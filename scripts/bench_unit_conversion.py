@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Benchmark unit conversion of daily org unit values.
+
+Compares the old path, which flattens the (day, org unit) values to rows and converts the value
+column through a pint Quantity, with convert_units() in main.py, which applies a cached scale and
+offset in place on the compact array before flattening. Sizes are a month and a year of days for
+DHIS2 levels 2, 3 and 4.
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from metpy.units import units
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import convert_units  # noqa: E402
+
+# (number of days, number of org units)
+SIZES = [(31, 15), (365, 15), (365, 150), (365, 1500)]
+CONVERSIONS = [("m", "mm"), ("K", "degC")]
+
+
+def synthetic_values(n_days: int, n_units: int, seed: int = 0) -> xr.DataArray:
+    """Return daily org unit values shaped like the spatial aggregation output."""
+    rng = np.random.default_rng(seed)
+    return xr.DataArray(
+        rng.uniform(250.0, 310.0, (n_days, n_units)),
+        coords={
+            "valid_time": pd.date_range("2025-01-01", periods=n_days),
+            "id": [f"OU{i:08d}" for i in range(n_units)],
+        },
+        dims=("valid_time", "id"),
+        name="value",
+    )
+
+
+def pint_on_rows(da: xr.DataArray, from_units: str, to_units: str) -> pd.DataFrame:
+    """The previous conversion: flatten to rows, then convert the value column through pint."""
+    dataframe = da.to_dataframe().reset_index()
+    converted = (dataframe["value"].values * units(from_units)).to(to_units).magnitude
+    return dataframe.assign(value=converted)
+
+
+def scale_on_array(da: xr.DataArray, from_units: str, to_units: str) -> pd.DataFrame:
+    """The current conversion: scale and offset in place on the (day, org unit) array, then flatten."""
+    return da.copy(data=convert_units(da.values, from_units, to_units)).to_dataframe().reset_index()
+
+
+def pint_only(da: xr.DataArray, from_units: str, to_units: str) -> np.ndarray:
+    """Only the conversion of the previous path, on the flattened values."""
+    return (da.values.ravel() * units(from_units)).to(to_units).magnitude
+
+
+def scale_only(da: xr.DataArray, from_units: str, to_units: str) -> np.ndarray:
+    """Only the conversion of the current path."""
+    return convert_units(da.values, from_units, to_units)
+
+
+def measure(func, da: xr.DataArray, from_units: str, to_units: str, repeat: int) -> tuple[float, float]:
+    """Return best wall time in seconds and peak Python heap in MB, converting a fresh copy each time."""
+    best = math.inf
+    for _ in range(repeat):
+        values = da.copy(deep=True)
+        started = time.perf_counter()
+        func(values, from_units, to_units)
+        best = min(best, time.perf_counter() - started)
+    values = da.copy(deep=True)
+    tracemalloc.start()
+    func(values, from_units, to_units)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions per conversion (best is reported)")
+    args = parser.parse_args()
+
+    print(
+        f"{'units':>12} {'days':>5} {'org units':>9} {'pint ms':>8} {'scale ms':>9} {'speedup':>8} "
+        f"{'convert only':>14} {'speedup':>8} {'peak MB':>15}"
+    )
+    for from_units, to_units in CONVERSIONS:
+        for n_days, n_units in SIZES:
+            da = synthetic_values(n_days, n_units)
+            expected = pint_on_rows(da, from_units, to_units)["value"].values
+            actual = scale_on_array(da.copy(deep=True), from_units, to_units)["value"].values
+            assert np.allclose(actual, expected, rtol=1e-12), f"{from_units} -> {to_units} differs"
+            old_time, old_peak = measure(pint_on_rows, da, from_units, to_units, args.repeat)
+            new_time, new_peak = measure(scale_on_array, da, from_units, to_units, args.repeat)
+            old_convert, _ = measure(pint_only, da, from_units, to_units, args.repeat)
+            new_convert, _ = measure(scale_only, da, from_units, to_units, args.repeat)
+            print(
+                f"{from_units + ' -> ' + to_units:>12} {n_days:>5} {n_units:>9} {old_time * 1e3:>8.2f} "
+                f"{new_time * 1e3:>9.2f} {old_time / new_time:>7.1f}x "
+                f"{old_convert * 1e3:>6.2f} -> {new_convert * 1e3:<5.2f} {old_convert / new_convert:>7.1f}x "
+                f"{old_peak:>6.1f} -> {new_peak:<6.1f}"
+            )
+    print("Times in ms include flattening to rows unless marked convert only; values are copied outside the timing.")
+
+
+if __name__ == "__main__":
+    main()
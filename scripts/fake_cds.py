@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""Offline stand-in for the CDS API, for benchmarking and testing the download path.
+
+Serves the parts of the CDS retrieve API that ecmwf-datastores uses: jobs are
+queued, run a limited number at a time like CDS does per user, and finish with
+a synthetic ERA5-Land file covering the requested area, days, hours and
+variables. Daily statistics requests (derived-era5-land-daily-statistics) get
+the mean, maximum or minimum of the same hourly values over each local day. Point the import at it with:
+
+    CDSAPI_URL=http://localhost:8765 CDSAPI_KEY=anything python main.py
+
+Values are a smooth function of time and position, so the same hour always has
+the same value and repeated or extended downloads merge cleanly. Accumulated
+variables (tp, ssrd, ...) are accumulated since 00 UTC like the real data.
+Latency, job failures and transient HTTP errors can be injected to exercise
+concurrency, retries and cache reuse. The client waits CDSAPI_RETRY_AFTER
+seconds (120 by default) before retrying a transient error.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import queue
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+# CDS variable name -> (short name in the file, units, accumulated since 00 UTC, typical hourly value)
+VARIABLES = {
+    "total_precipitation": ("tp", "m", True, 2e-4),
+    "total_evaporation": ("e", "m of water equivalent", True, -1e-4),
+    "potential_evaporation": ("pev", "m", True, -2e-4),
+    "runoff": ("ro", "m", True, 1e-4),
+    "snowfall": ("sf", "m of water equivalent", True, 1e-5),
+    "surface_solar_radiation_downwards": ("ssrd", "J m**-2", True, 6e5),
+    "surface_net_solar_radiation": ("ssr", "J m**-2", True, 5e5),
+    "surface_thermal_radiation_downwards": ("strd", "J m**-2", True, 1.2e6),
+    "2m_temperature": ("t2m", "K", False, 290.0),
+    "2m_dewpoint_temperature": ("d2m", "K", False, 285.0),
+    "skin_temperature": ("skt", "K", False, 292.0),
+    "surface_pressure": ("sp", "Pa", False, 95000.0),
+    "10m_u_component_of_wind": ("u10", "m s**-1", False, 2.0),
+    "10m_v_component_of_wind": ("v10", "m s**-1", False, 1.0),
+}
+
+# Relative weight of each hour of the day (1..24) for accumulated variables, peaking in the afternoon
+HOUR_WEIGHTS = 1 + 0.8 * np.sin(np.pi * (np.arange(1, 25) - 8) / 12).clip(0)
+CUMULATIVE_WEIGHTS = np.concatenate([[0.0], np.cumsum(HOUR_WEIGHTS) / HOUR_WEIGHTS.sum() * 24])
+
+
+def _as_list(value) -> list[str]:
+    return [str(v) for v in value] if isinstance(value, list | tuple) else [str(value)]
+
+
+def request_times(request: dict) -> pd.DatetimeIndex:
+    """Return the valid times asked for, skipping dates that do not exist (e.g. 31 February).
+
+    Daily statistics requests have no time, their days are returned at 00:00.
+    """
+    times = []
+    for year, month, day, hour in itertools.product(
+        _as_list(request["year"]),
+        _as_list(request["month"]),
+        _as_list(request["day"]),
+        _as_list(request.get("time", "00:00")),
+    ):
+        try:
+            times.append(pd.Timestamp(f"{year}-{int(month):02d}-{int(day):02d} {hour}"))
+        except ValueError:
+            continue
+    return pd.DatetimeIndex(sorted(set(times)))
+
+
+def _daily_field(days: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Smooth, positive (day, lat, lon) pattern that drifts from day to day."""
+    d = days[:, None, None]
+    return 1 + 0.5 * np.sin(0.7 * lat[None, :, None] + 0.3 * d) * np.cos(0.5 * lon[None, None, :] - 0.2 * d)
+
+
+def synthetic_variable(times: pd.DatetimeIndex, lat: np.ndarray, lon: np.ndarray, cumulative: bool, scale: float):
+    """Values for every (time, lat, lon), identical for the same hour whichever request it comes from."""
+    hours = np.asarray(times.hour)
+    days = np.asarray((times.normalize() - pd.Timestamp("1970-01-01")).days, dtype=float)
+    if cumulative:
+        # The 00 UTC step holds the whole previous day
+        days = np.where(hours == 0, days - 1, days)
+        steps = np.where(hours == 0, 24, hours)
+        return scale * _daily_field(days, lat, lon) * CUMULATIVE_WEIGHTS[steps][:, None, None]
+    diurnal = np.sin(2 * np.pi * (hours - 9) / 24)[:, None, None]
+    return scale * (1 + 0.02 * _daily_field(days, lat, lon) + 0.01 * diurnal)
+
+
+# Daily statistic name -> NumPy reduction over the hours of each local day
+DAILY_STATISTICS = {"daily_mean": "mean", "daily_maximum": "max", "daily_minimum": "min"}
+
+
+def daily_statistic(
+    days: pd.DatetimeIndex, lat: np.ndarray, lon: np.ndarray, cumulative: bool, scale: float, request: dict
+) -> np.ndarray:
+    """Reduce the hourly values of each local day (time_zone "utc+HH:00") with the requested daily statistic."""
+    match = re.fullmatch(r"utc([+-]\d{2}):00", request.get("time_zone", "utc+00:00"))
+    if not match or request["daily_statistic"] not in DAILY_STATISTICS:
+        raise ValueError(f"Unsupported daily statistic request: {request}")
+    offset = pd.Timedelta(hours=int(match.group(1)))
+    hours = pd.DatetimeIndex([day + pd.Timedelta(hours=hour) - offset for day in days for hour in range(24)])
+    values = synthetic_variable(hours, lat, lon, cumulative, scale)
+    values = values.reshape(len(days), 24, len(lat), len(lon))
+    return getattr(values, DAILY_STATISTICS[request["daily_statistic"]])(axis=1)
+
+
+def synthetic_dataset(request: dict, grid_step: float) -> xr.Dataset:
+    """Build the ERA5-Land dataset CDS would return for request, on a grid_step degree grid."""
+    north, west, south, east = (float(v) for v in request["area"])
+    lat = np.round(np.arange(north, south - grid_step / 2, -grid_step), 4)
+    lon = np.round(np.arange(west, east + grid_step / 2, grid_step), 4)
+    times = request_times(request)
+    data_vars = {}
+    for variable in _as_list(request["variable"]):
+        if variable not in VARIABLES:
+            raise ValueError(f"Unknown variable {variable!r}; known: {', '.join(sorted(VARIABLES))}")
+        short_name, units, cumulative, scale = VARIABLES[variable]
+        if "daily_statistic" in request:
+            values = daily_statistic(times, lat, lon, cumulative, scale, request).astype("float32")
+        else:
+            values = synthetic_variable(times, lat, lon, cumulative, scale).astype("float32")
+        data_vars[short_name] = (
+            ("valid_time", "latitude", "longitude"),
+            values,
+            {"units": units, "long_name": variable},
+        )
+    return xr.Dataset(
+        data_vars,
+        coords={"valid_time": times.values, "latitude": lat, "longitude": lon, "number": 0, "expver": "0001"},
+        attrs={"institution": "fake_cds", "Conventions": "CF-1.7"},
+    )
+
+
+# netCDF variable name -> GRIB shortName, where they differ
+GRIB_NAMES = {"t2m": "2t", "d2m": "2d", "u10": "10u", "v10": "10v"}
+
+
+def write_grib(ds: xr.Dataset, path: str) -> None:
+    """Write one GRIB1 message per variable and valid time, as the CDS GRIB download has."""
+    import eccodes
+
+    lat, lon = ds.latitude.values, ds.longitude.values
+    grid = {
+        "Ni": len(lon),
+        "Nj": len(lat),
+        "latitudeOfFirstGridPointInDegrees": float(lat[0]),
+        "longitudeOfFirstGridPointInDegrees": float(lon[0]),
+        "latitudeOfLastGridPointInDegrees": float(lat[-1]),
+        "longitudeOfLastGridPointInDegrees": float(lon[-1]),
+        "iDirectionIncrementInDegrees": float(abs(lon[1] - lon[0])) if len(lon) > 1 else 0.1,
+        "jDirectionIncrementInDegrees": float(abs(lat[1] - lat[0])) if len(lat) > 1 else 0.1,
+    }
+    with open(path, "wb") as f:
+        for name, da in ds.data_vars.items():
+            for time_value, values in zip(pd.DatetimeIndex(ds.valid_time.values), da.values):
+                handle = eccodes.codes_grib_new_from_samples("regular_ll_sfc_grib1")
+                try:
+                    for key, value in grid.items():
+                        eccodes.codes_set(handle, key, value)
+                    eccodes.codes_set(handle, "dataDate", int(time_value.strftime("%Y%m%d")))
+                    eccodes.codes_set(handle, "dataTime", time_value.hour * 100)
+                    eccodes.codes_set(handle, "shortName", GRIB_NAMES.get(str(name), str(name)))
+                    eccodes.codes_set_values(handle, values.astype("float64").ravel())
+                    eccodes.codes_write(handle, f)
+                finally:
+                    eccodes.codes_release(handle)
+
+
+# netCDF4/HDF5 (and eccodes) are not thread-safe, so workers write their payloads one at a time
+WRITE_LOCK = threading.Lock()
+
+
+def write_payload(ds: xr.Dataset, path: str, data_format: str) -> None:
+    with WRITE_LOCK:
+        if data_format == "grib":
+            write_grib(ds, path)
+        else:
+            ds.to_netcdf(path, encoding={name: {"zlib": True, "complevel": 1} for name in ds.data_vars})
+
+
+class Job:
+    def __init__(self, process_id: str, request: dict) -> None:
+        self.id = str(uuid.uuid4())
+        self.process_id = process_id
+        self.request = request
+        self.status = "accepted"
+        self.created = datetime.now(timezone.utc)
+        self.started: datetime | None = None
+        self.finished: datetime | None = None
+        self.path: str | None = None
+        self.error: str | None = None
+
+
+class FakeCDS:
+    """Job queue and workers; at most max_running jobs run at once, the rest wait as accepted."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.jobs: dict[str, Job] = {}
+        self.lock = threading.Lock()
+        self.pending: queue.Queue[Job] = queue.Queue()
+        self.random = random.Random(args.seed)
+        self.folder = tempfile.mkdtemp(prefix="fake_cds_")
+        self.stats = {"submitted": 0, "successful": 0, "failed": 0, "injected_errors": 0, "bytes": 0}
+        for _ in range(args.max_running):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def chance(self, rate: float) -> bool:
+        with self.lock:
+            return self.random.random() < rate
+
+    def latency(self, seconds: float) -> float:
+        with self.lock:
+            return seconds * (1 + self.args.jitter * (2 * self.random.random() - 1))
+
+    def submit(self, process_id: str, request: dict) -> Job:
+        job = Job(process_id, request)
+        with self.lock:
+            self.jobs[job.id] = job
+            self.stats["submitted"] += 1
+        self.pending.put(job)
+        return job
+
+    def _worker(self) -> None:
+        while True:
+            job = self.pending.get()
+            wait = self.latency(self.args.queue_latency) - (datetime.now(timezone.utc) - job.created).total_seconds()
+            time.sleep(max(wait, 0))
+            job.started = datetime.now(timezone.utc)
+            job.status = "running"
+            try:
+                time.sleep(self.latency(self.args.run_latency))
+                if self.chance(self.args.fail_rate):
+                    raise RuntimeError("Injected failure")
+                data_format = job.request.get("data_format", "netcdf")
+                path = os.path.join(self.folder, f"{job.id}.{'grib' if data_format == 'grib' else 'nc'}")
+                write_payload(synthetic_dataset(job.request, self.args.grid_step), path, data_format)
+                job.path = path
+                job.status = "successful"
+                with self.lock:
+                    self.stats["successful"] += 1
+                    self.stats["bytes"] += os.path.getsize(path)
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+                with self.lock:
+                    self.stats["failed"] += 1
+            job.finished = datetime.now(timezone.utc)
+            print(f"{job.id} {job.status} {len(request_times(job.request))} hours {job.error or ''}", flush=True)
+
+
+def _iso(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+class Handler(BaseHTTPRequestHandler):
+    server: "Server"
+
+    def log_message(self, format, *args) -> None:
+        if self.server.cds.args.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, body: dict | list, status: int = 200) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _not_found(self) -> None:
+        self._send_json({"title": "Not found", "detail": self.path}, 404)
+
+    def _base(self) -> str:
+        return f"http://{self.headers.get('Host')}"
+
+    def _injected_error(self) -> bool:
+        cds = self.server.cds
+        if not cds.chance(cds.args.error_rate):
+            return False
+        with cds.lock:
+            cds.stats["injected_errors"] += 1
+        self._send_json({"title": "Service temporarily unavailable"}, 503)
+        return True
+
+    def _job_json(self, job: Job) -> dict:
+        job_url = f"{self._base()}/retrieve/v1/jobs/{job.id}"
+        return {
+            "processID": job.process_id,
+            "type": "process",
+            "jobID": job.id,
+            "status": job.status,
+            "created": _iso(job.created),
+            "started": _iso(job.started),
+            "finished": _iso(job.finished),
+            "updated": _iso(job.finished or job.started or job.created),
+            "metadata": {},
+            "links": [
+                {"rel": "self", "href": job_url},
+                {"rel": "monitor", "href": job_url},
+                {"rel": "results", "href": f"{job_url}/results"},
+            ],
+        }
+
+    def do_GET(self) -> None:
+        path = self.path.split("?")[0].rstrip("/")
+        cds = self.server.cds
+        if path == "/catalogue/v1/messages":
+            return self._send_json({"messages": []})
+        if path == "/stats":
+            with cds.lock:
+                return self._send_json(dict(cds.stats))
+        if match := re.fullmatch(r"/retrieve/v1/processes/([\w-]+)", path):
+            return self._send_json({"id": match[1], "links": []})
+        if self._injected_error():
+            return
+        if match := re.fullmatch(r"/retrieve/v1/jobs/([\w-]+)(/results)?", path):
+            job = cds.jobs.get(match[1])
+            if job is None:
+                return self._not_found()
+            if not match[2]:
+                return self._send_json(self._job_json(job))
+            if job.status == "failed":
+                return self._send_json({"title": "The job has failed", "detail": job.error}, 400)
+            if job.status != "successful" or job.path is None:
+                return self._send_json({"title": "Results not ready", "detail": job.status}, 404)
+            media_type = "application/x-grib" if job.path.endswith(".grib") else "application/netcdf"
+            href = f"{self._base()}/download/{os.path.basename(job.path)}"
+            return self._send_json(
+                {"asset": {"value": {"href": href, "type": media_type, "file:size": os.path.getsize(job.path)}}}
+            )
+        if match := re.fullmatch(r"/download/([\w.-]+)", path):
+            filename = os.path.join(cds.folder, match[1])
+            if not os.path.exists(filename):
+                return self._not_found()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(os.path.getsize(filename)))
+            self.end_headers()
+            with open(filename, "rb") as f:
+                shutil.copyfileobj(f, self.wfile)
+            return
+        self._not_found()
+
+    def do_POST(self) -> None:
+        path = self.path.split("?")[0].rstrip("/")
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if path == "/profiles/v1/account/verification/pat":
+            return self._send_json({"id": "fake-user"})
+        if self._injected_error():
+            return
+        if match := re.fullmatch(r"/retrieve/v1/processes/([\w-]+)/execution", path):
+            request = json.loads(body or b"{}").get("inputs", {})
+            try:
+                synthetic_dataset({**request, "year": [], "day": []}, self.server.cds.args.grid_step)
+            except (KeyError, ValueError) as e:
+                return self._send_json({"title": "Invalid request", "detail": str(e)}, 400)
+            job = self.server.cds.submit(match[1], request)
+            return self._send_json(self._job_json(job), 201)
+        self._not_found()
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], cds: FakeCDS) -> None:
+        super().__init__(address, Handler)
+        self.cds = cds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--max-running", type=int, default=2, help="Jobs processed at once; the rest stay queued")
+    parser.add_argument("--queue-latency", type=float, default=2.0, help="Minimum seconds a job stays queued")
+    parser.add_argument("--run-latency", type=float, default=5.0, help="Seconds a job runs before its file is ready")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- fraction applied to each latency")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of jobs that fail")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of job API calls answered with 503")
+    parser.add_argument(
+        "--grid-step",
+        type=float,
+        default=0.1,
+        help="Grid spacing in degrees (ERA5-Land is 0.1; smaller = larger files)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency jitter and injected failures")
+    parser.add_argument("--verbose", action="store_true", help="Log every HTTP request")
+    args = parser.parse_args()
+
+    cds = FakeCDS(args)
+    server = Server((args.host, args.port), cds)
+    print(f"Fake CDS API on http://{args.host}:{args.port} (files in {cds.folder})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        shutil.rmtree(cds.folder, ignore_errors=True)
+        print(json.dumps(cds.stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""Local DHIS2 stand-in for measuring import throughput.
+
+Serves the parts of the DHIS2 Web API the import uses: system info, org unit
+metadata and GeoJSON for a synthetic hierarchy, the data element and
+dataValueSets queries behind the latest-imported-period lookup, and
+dataValueSets imports with a realistic import summary. Point the import at it:
+
+    DHIS2_BASE_URL=http://localhost:8080 DHIS2_USERNAME=admin DHIS2_PASSWORD=district python main.py
+
+The hierarchy is a tiling of --bbox: level 1 is one org unit and each next
+level splits every parent into --branching children, so level 3 of
+"15,10" has 150 org units. Imported values are kept in memory while the
+server runs, so a second run resumes where the first stopped. Imports take
+--latency plus one second per --import-rate values, with at most
+--max-imports processed at once, to benchmark payload and batch sizes.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+UID_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+
+def make_uid(seed: str) -> str:
+    """Deterministic 11 character DHIS2-style uid (a letter followed by 10 letters or digits)."""
+    digest = hashlib.sha256(seed.encode()).digest()
+    return UID_CHARS[digest[0] % 52] + "".join(UID_CHARS[b % 62] for b in digest[1:11])
+
+
+def _ring(bbox: tuple[float, float, float, float], vertices: int) -> list[list[float]]:
+    """Closed rectangle ring with about `vertices` points, so boundary size can match real data."""
+    xmin, ymin, xmax, ymax = bbox
+    per_side = max(vertices // 4, 1)
+    corners = [(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax), (xmin, ymin)]
+    ring = []
+    for (x0, y0), (x1, y1) in zip(corners, corners[1:]):
+        for i in range(per_side):
+            ring.append([round(x0 + (x1 - x0) * i / per_side, 6), round(y0 + (y1 - y0) * i / per_side, 6)])
+    return ring + [ring[0]]
+
+
+def build_hierarchy(bbox: tuple[float, float, float, float], branching: list[int], vertices: int) -> list[dict]:
+    """Return org units of every level; each level tiles its parents into a grid of children."""
+    root: dict = {"id": make_uid("root"), "name": "Fake country", "level": 1, "parent": None, "bbox": bbox}
+    root["path"] = f"/{root['id']}"
+    org_units = [root]
+    parents = [root]
+    for level, n_children in enumerate(branching, start=2):
+        cols = math.ceil(math.sqrt(n_children))
+        rows = math.ceil(n_children / cols)
+        children = []
+        for parent in parents:
+            xmin, ymin, xmax, ymax = parent["bbox"]
+            height = (ymax - ymin) / rows
+            for i in range(n_children):
+                # The last row is stretched over the remaining columns so children always tile the parent
+                row, col = divmod(i, cols)
+                row_cols = n_children - row * cols if row == rows - 1 else cols
+                col_width = (xmax - xmin) / row_cols
+                uid = make_uid(f"{parent['id']}/{i}")
+                child_bbox = (
+                    xmin + col * col_width,
+                    ymin + row * height,
+                    xmin + (col + 1) * col_width,
+                    ymin + (row + 1) * height,
+                )
+                children.append(
+                    {
+                        "id": uid,
+                        "name": f"{parent['name']} / {i + 1}" if level > 2 else f"Region {i + 1}",
+                        "level": level,
+                        "parent": parent["id"],
+                        "path": f"{parent['path']}/{uid}",
+                        "bbox": child_bbox,
+                    }
+                )
+        org_units.extend(children)
+        parents = children
+    for org_unit in org_units:
+        org_unit["geometry"] = {"type": "Polygon", "coordinates": [_ring(org_unit["bbox"], vertices)]}
+    return org_units
+
+
+def period_bounds(period: str) -> tuple[date, date]:
+    """First and last day of a daily, weekly, monthly or yearly ISO period id."""
+    if re.fullmatch(r"\d{8}", period):
+        day = datetime.strptime(period, "%Y%m%d").date()
+        return day, day
+    if match := re.fullmatch(r"(\d{4})W(\d{1,2})", period):
+        start = date.fromisocalendar(int(match[1]), int(match[2]), 1)
+        return start, start + timedelta(days=6)
+    if re.fullmatch(r"\d{6}", period):
+        start = datetime.strptime(period, "%Y%m").date()
+        next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return start, next_month - timedelta(days=1)
+    if re.fullmatch(r"\d{4}", period):
+        return date(int(period), 1, 1), date(int(period), 12, 31)
+    raise ValueError(f"Unsupported period {period!r}")
+
+
+class FakeDHIS2:
+    """In-memory org units and data values shared by the request handlers."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.org_units = build_hierarchy(args.bbox, args.branching, args.vertices)
+        self.by_id = {org_unit["id"]: org_unit for org_unit in self.org_units}
+        self.last_updated = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000")
+        # (dataElement, period, orgUnit) -> value
+        self.values: dict[tuple[str, str, str], str] = {}
+        self.lock = threading.Lock()
+        self.imports = threading.Semaphore(args.max_imports)
+        self.stats = {"imports": 0, "values_received": 0, "bytes_received": 0, "import_seconds": 0.0}
+
+    def level_units(self, levels: list[int], parent: str | None = None) -> list[dict]:
+        return [
+            org_unit
+            for org_unit in self.org_units
+            if (not levels or org_unit["level"] in levels) and (parent is None or f"/{parent}/" in org_unit["path"])
+        ]
+
+    def import_values(self, data_values: list[dict], dry_run: bool) -> dict:
+        """Validate and store data values the way DHIS2 counts them, returning the import summary."""
+        counts = {"imported": 0, "updated": 0, "ignored": 0, "deleted": 0}
+        conflicts = []
+        with self.lock:
+            for index, data_value in enumerate(data_values):
+                key = (
+                    data_value.get("dataElement", ""),
+                    str(data_value.get("period", "")),
+                    data_value.get("orgUnit", ""),
+                )
+                error = None
+                if key[2] not in self.by_id:
+                    error = f"Org unit not found or not accessible: `{key[2]}`"
+                else:
+                    try:
+                        period_bounds(key[1])
+                        float(data_value["value"])
+                    except (KeyError, TypeError, ValueError) as e:
+                        error = str(e) if "period" in str(e) else f"Value must be a number: `{data_value.get('value')}`"
+                if error:
+                    counts["ignored"] += 1
+                    conflicts.append({"object": key[2], "value": error, "errorCode": "E7600", "indexes": [index]})
+                    continue
+                counts["updated" if key in self.values else "imported"] += 1
+                if not dry_run:
+                    self.values[key] = str(data_value["value"])
+        return {
+            "responseType": "ImportSummary",
+            "status": "WARNING" if conflicts else "SUCCESS",
+            "importOptions": {"dryRun": dry_run, "importStrategy": "CREATE_AND_UPDATE"},
+            "description": "Import process completed successfully",
+            "importCount": counts,
+            "conflicts": conflicts[:50],
+            "dataSetComplete": "false",
+        }
+
+    def query_values(self, data_elements: list[str], org_units: list[str], children: bool, start: date, end: date):
+        paths = [self.by_id[uid]["path"] for uid in org_units if uid in self.by_id]
+        with self.lock:
+            items = list(self.values.items())
+        rows = []
+        for (data_element, period, org_unit), value in items:
+            if data_element not in data_elements or org_unit not in self.by_id:
+                continue
+            path = self.by_id[org_unit]["path"]
+            if not any(path == p or (children and path.startswith(f"{p}/")) for p in paths):
+                continue
+            first, last = period_bounds(period)
+            if first >= start and last <= end:
+                rows.append({"dataElement": data_element, "period": period, "orgUnit": org_unit, "value": value})
+        return rows
+
+
+class Handler(BaseHTTPRequestHandler):
+    server: "Server"
+
+    def log_message(self, format, *args) -> None:
+        if self.server.dhis2.args.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, body: dict, status: int = 200) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str) -> None:
+        self._send_json(
+            {"httpStatus": self.responses[status][0], "httpStatusCode": status, "status": "ERROR", "message": message},
+            status,
+        )
+
+    def _authorized(self) -> bool:
+        args = self.server.dhis2.args
+        expected = base64.b64encode(f"{args.username}:{args.password}".encode()).decode()
+        if self.headers.get("Authorization") == f"Basic {expected}":
+            return True
+        self._error(401, "Unauthorized")
+        return False
+
+    def _parse(self) -> tuple[str, dict[str, list[str]]]:
+        parts = urlsplit(self.path)
+        return parts.path.rstrip("/"), parse_qs(parts.query)
+
+    def do_GET(self) -> None:
+        dhis2 = self.server.dhis2
+        path, query = self._parse()
+        if path == "/stats":
+            with dhis2.lock:
+                return self._send_json({**dhis2.stats, "values_stored": len(dhis2.values)})
+        if not self._authorized():
+            return
+        time.sleep(dhis2.args.latency)
+        levels = [int(level) for level in query.get("level", [])]
+        if path == "/api/system/info":
+            return self._send_json(
+                {"version": "2.41.0", "calendar": "iso8601", "systemName": "Fake DHIS2", "serverTimeZoneId": "UTC"}
+            )
+        if path == "/api/organisationUnits.geojson":
+            features = [
+                {
+                    "type": "Feature",
+                    "id": org_unit["id"],
+                    "geometry": org_unit["geometry"],
+                    "properties": {
+                        "name": org_unit["name"],
+                        "level": str(org_unit["level"]),
+                        "parent": org_unit["parent"],
+                    },
+                }
+                for org_unit in dhis2.level_units(levels, query.get("parent", [""])[0] or None)
+            ]
+            return self._send_json({"type": "FeatureCollection", "features": features})
+        if path == "/api/organisationUnits":
+            units = [
+                {
+                    "id": ou["id"],
+                    "name": ou["name"],
+                    "level": ou["level"],
+                    "path": ou["path"],
+                    "lastUpdated": dhis2.last_updated,
+                }
+                for ou in dhis2.level_units(levels)
+            ]
+            return self._send_json({"organisationUnits": units})
+        if match := re.fullmatch(r"/api/dataElements/(\w+)(\.json)?", path):
+            data_set = {"id": make_uid("dataSet"), "name": "Fake climate data", "periodType": dhis2.args.period_type}
+            return self._send_json({"id": match[1], "dataSetElements": [{"dataSet": data_set}]})
+        if path == "/api/dataValueSets":
+            try:
+                start = date.fromisoformat(query["startDate"][0])
+                end = date.fromisoformat(query["endDate"][0])
+            except (KeyError, ValueError):
+                return self._error(409, "Start date and end date must be specified")
+            rows = dhis2.query_values(
+                query.get("dataElement", []),
+                query.get("orgUnit", []),
+                query.get("children", ["false"])[0] == "true",
+                start,
+                end,
+            )
+            return self._send_json({"dataValues": rows})
+        self._error(404, f"Not found: {path}")
+
+    def do_POST(self) -> None:
+        if not self._authorized():
+            return
+        dhis2 = self.server.dhis2
+        path, query = self._parse()
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if path != "/api/dataValueSets":
+            return self._error(404, f"Not found: {path}")
+        try:
+            data_values = json.loads(body).get("dataValues", [])
+        except (json.JSONDecodeError, AttributeError):
+            return self._error(400, "Invalid JSON payload")
+        dry_run = query.get("dryRun", ["false"])[0] == "true"
+        started = time.perf_counter()
+        with dhis2.imports:
+            time.sleep(dhis2.args.latency + len(data_values) / dhis2.args.import_rate)
+            summary = dhis2.import_values(data_values, dry_run)
+        seconds = time.perf_counter() - started
+        with dhis2.lock:
+            dhis2.stats["imports"] += 1
+            dhis2.stats["values_received"] += len(data_values)
+            dhis2.stats["bytes_received"] += len(body)
+            dhis2.stats["import_seconds"] += seconds
+        print(
+            f"Imported {len(data_values)} values ({len(body) / 1e6:.1f} MB) in {seconds:.2f}s: {summary['importCount']}",
+            flush=True,
+        )
+        self._send_json(
+            {
+                "httpStatus": "OK",
+                "httpStatusCode": 200,
+                "status": "OK",
+                "message": "Import was successful."
+                if summary["status"] == "SUCCESS"
+                else "One or more conflicts encountered",
+                "response": summary,
+            }
+        )
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], dhis2: FakeDHIS2) -> None:
+        super().__init__(address, Handler)
+        self.dhis2 = dhis2
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--username", default="admin", help="Basic auth username")
+    parser.add_argument("--password", default="district", help="Basic auth password")
+    parser.add_argument(
+        "--bbox",
+        type=lambda value: tuple(float(v) for v in value.split(",")),
+        default=(30.0, -5.0, 40.0, 5.0),
+        help="Extent of the country as xmin,ymin,xmax,ymax",
+    )
+    parser.add_argument(
+        "--branching",
+        type=lambda value: [int(v) for v in value.split(",")],
+        default=[15, 10, 10],
+        help="Children per org unit at levels 2, 3, ... (default 15,10,10 = 15, 150 and 1500 org units)",
+    )
+    parser.add_argument("--vertices", type=int, default=200, help="Vertices per org unit boundary")
+    parser.add_argument(
+        "--period-type", default="DAILY", help="Period type of the data set the data elements belong to"
+    )
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every request")
+    parser.add_argument("--import-rate", type=float, default=5000, help="Data values imported per second")
+    parser.add_argument("--max-imports", type=int, default=1, help="Imports processed at once; others wait")
+    parser.add_argument("--verbose", action="store_true", help="Log every HTTP request")
+    args = parser.parse_args()
+
+    dhis2 = FakeDHIS2(args)
+    server = Server((args.host, args.port), dhis2)
+    sizes = ", ".join(
+        f"level {level}: {len(dhis2.level_units([level]))}" for level in range(1, len(args.branching) + 2)
+    )
+    print(f"Fake DHIS2 on http://{args.host}:{args.port} ({sizes} org units)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(dhis2.stats))
+
+
+if __name__ == "__main__":
+    main()